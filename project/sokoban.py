@@ -1,16 +1,19 @@
+import glob
+import os
 import random
 import time
 
 import pygame
-import pygame_widgets
 
 from src.astar import solve_astar
 from src.bfs import solve_bfs
+from src.bidirectional import solve_bidirectional
 from src.events import *
 from src.game import Game
 from src.generator import generate
-from src.utils import play_solution
-from src.widgets import sidebar_widgets
+from src.idastar import solve_idastar
+from src.portfolio import solve_portfolio
+from src.widgets import FPS, Renderer, play_solution, sidebar_widgets, solver_progress
 
 # Set the seed for random number generation to ensure reproducibility.
 random.seed(6)  
@@ -46,6 +49,8 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
     
     # Initialize the game with the given level
     game = Game(level=level, window=window)
+    renderer = Renderer(game, widgets)
+    clock = pygame.time.Clock()
     game_loop = True
     
     while game_loop:
@@ -112,8 +117,7 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
                 start = time.time()  # Record start time
                 solution, depth = solve_bfs(
                     game.get_matrix(), 
-                    widget=widgets['paths'], 
-                    visualizer=widgets['toggle'].getValue()
+                    progress=solver_progress(widgets['paths'], widgets['toggle'].getValue())
                 )
                 runtime = round(time.time() - start, 5)  # Calculate runtime
                 if solution:
@@ -123,7 +127,7 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
                         f'[BFS] Solution Found in {runtime}s!\n{solution}',
                         20,
                     )
-                    moves = play_solution(solution, game, widgets, show_solution, moves)
+                    moves = play_solution(solution, game, widgets, show_solution, moves, renderer)
                 else:
                     widgets['paths'].solved = False
                     widgets['paths'].set_text(
@@ -138,8 +142,7 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
                 start = time.time()  # Record start time
                 solution, depth = solve_astar(
                     game.get_matrix(), 
-                    widget=widgets['paths'], 
-                    visualizer=widgets['toggle'].getValue(),
+                    progress=solver_progress(widgets['paths'], widgets['toggle'].getValue()),
                     heuristic='manhattan',
                 )
                 runtime = round(time.time() - start, 5)  # Calculate runtime
@@ -150,7 +153,7 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
                         f'[A*] Solution Found in {runtime}s!\n{solution}',
                         20,
                     )
-                    moves = play_solution(solution, game, widgets, show_solution, moves)
+                    moves = play_solution(solution, game, widgets, show_solution, moves, renderer)
                 else:
                     widgets['paths'].solved = False
                     widgets['paths'].set_text(
@@ -165,8 +168,7 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
                 start = time.time()  # Record start time
                 solution, depth = solve_astar(
                     game.get_matrix(), 
-                    widget=widgets['paths'], 
-                    visualizer=widgets['toggle'].getValue(),
+                    progress=solver_progress(widgets['paths'], widgets['toggle'].getValue()),
                     heuristic='dijkstra',
                 )
                 runtime = round(time.time() - start, 5)  # Calculate runtime
@@ -177,7 +179,7 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
                         f'[Dijkstra] Solution Found in {runtime}s!\n{solution}',
                         20
                     )
-                    moves = play_solution(solution, game, widgets, show_solution, moves)
+                    moves = play_solution(solution, game, widgets, show_solution, moves, renderer)
                 else:
                     widgets['paths'].solved = False
                     widgets['paths'].set_text(
@@ -185,6 +187,58 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
                         ('Deadlock Found!' if depth < 0 else f'Depth {depth}'), 
                         20,
                     )
+            elif event.type == SOLVE_MATCHING_EVENT:
+                print('Finding a solution for the puzzle\n')
+                widgets['paths'].reset('Solving with [Matching]')
+                show_solution = True
+                start = time.time()  # Record start time
+                solution, depth = solve_astar(
+                    game.get_matrix(), 
+                    progress=solver_progress(widgets['paths'], widgets['toggle'].getValue()),
+                    heuristic='matching',
+                )
+                runtime = round(time.time() - start, 5)  # Calculate runtime
+                if solution:
+                    widgets['paths'].solved = True
+                    widgets['paths'].transparency = True
+                    widgets['paths'].set_text(
+                        f'[Matching] Solution Found in {runtime}s!\n{solution}',
+                        20
+                    )
+                    moves = play_solution(solution, game, widgets, show_solution, moves, renderer)
+                else:
+                    widgets['paths'].solved = False
+                    widgets['paths'].set_text(
+                        '[Matching] Solution Not Found!\n' + 
+                        ('Deadlock Found!' if depth < 0 else f'Depth {depth}'), 
+                        20,
+                    )
+            elif event.type == SOLVE_IDASTAR_EVENT:
+                print('Finding a solution for the puzzle\n')
+                widgets['paths'].reset('Solving with [IDA*]')
+                show_solution = True
+                start = time.time()  # Record start time
+                solution, depth = solve_idastar(
+                    game.get_matrix(), 
+                    progress=solver_progress(widgets['paths'], widgets['toggle'].getValue()),
+                    heuristic='matching',
+                )
+                runtime = round(time.time() - start, 5)  # Calculate runtime
+                if solution:
+                    widgets['paths'].solved = True
+                    widgets['paths'].transparency = True
+                    widgets['paths'].set_text(
+                        f'[IDA*] Solution Found in {runtime}s!\n{solution}',
+                        20
+                    )
+                    moves = play_solution(solution, game, widgets, show_solution, moves, renderer)
+                else:
+                    widgets['paths'].solved = False
+                    widgets['paths'].set_text(
+                        '[IDA*] Solution Not Found!\n' + 
+                        ('Deadlock Found!' if depth < 0 else f'Depth {depth}'), 
+                        20,
+                    )
             elif event.type == pygame.KEYDOWN:
                 # Handle player movement based on key presses
                 if event.key in (pygame.K_d, pygame.K_RIGHT):
@@ -196,18 +250,9 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
                 elif event.key in (pygame.K_s, pygame.K_DOWN):
                     moves += game.player.update(key='D')  # Move player down
         
-        # Draw game objects and update the display
-        game.floor_group.draw(window)
-        game.goal_group.draw(window)
-        game.object_group.draw(window)
-        pygame_widgets.update(events)
-        widgets['label'].draw()
-        widgets['seed'].draw()
-        widgets['visualizer'].draw()
-        widgets['moves_label'].set_moves(f' Moves = {moves} ', 20)
-        if show_solution:
-            widgets['paths'].draw()
-        pygame.display.update()
+        # Draw what changed since the last frame, nothing is drawn while idle
+        renderer.frame(events, moves, show_solution)
+        clock.tick(FPS)
         
         # Check if the level is completed
         if game.is_level_complete():
@@ -220,6 +265,7 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
                 for event in pygame.event.get():
                     if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
                         wait = False
+                clock.tick(FPS)
     del game
     print('Objects cleared!\n')
     return {
@@ -228,18 +274,30 @@ def play_game(window, level=1, random_game=False, random_seed=None, **widgets):
         'random_game': random_game,
     }
 
+# runtime and depth of every solver on every level, see src/benchmark.py for repeated runs and node counts
 def run_statistics():
+    # the solution cache is bypassed, the runtimes are the searches
     algorithms = [
-        ('A*manhattan', lambda game: solve_astar(game.get_matrix(), heuristic='manhattan')),
-        ('Dijkstra', lambda game: solve_astar(game.get_matrix(), heuristic='dijkstra')),
-        ('BFS', lambda game: solve_bfs(game.get_matrix()))
+        ('A*manhattan', lambda game: solve_astar(game.get_matrix(), heuristic='manhattan', cache=False)),
+        ('Dijkstra', lambda game: solve_astar(game.get_matrix(), heuristic='dijkstra', cache=False)),
+        ('Matching', lambda game: solve_astar(game.get_matrix(), heuristic='matching', cache=False)),
+        ('IDA*', lambda game: solve_idastar(game.get_matrix(), heuristic='matching', cache=False)),
+        ('BFS', lambda game: solve_bfs(game.get_matrix(), cache=False)),
+        ('Bidirectional', lambda game: solve_bidirectional(game.get_matrix())),
+        ('Portfolio', lambda game: solve_portfolio(game.get_matrix())[:2]),
     ]
     
-    with open('stat/ statistics.txt', 'w') as f:
+    # the levels on disk, lvl0.dat is the random game
+    levels = sorted(
+        int(os.path.basename(path)[3:-4]) for path in glob.glob('levels/lvl*.dat')
+        if os.path.basename(path) != 'lvl0.dat'
+    )
+    os.makedirs('stat', exist_ok=True)
+    with open('stat/statistics.txt', 'w') as f:
         f.write("Level, Algorithm, Runtime, Depth\n")
         
         for algo_name, algo_func in algorithms:
-            for level in range(1, 31):
+            for level in levels:
                 game = Game(level=level)
                 start_time = time.time()
                 _, depth = algo_func(game)
@@ -248,7 +306,7 @@ def run_statistics():
                 f.write(f"{level}, {algo_name}, {runtime}, {depth}\n")
                 print(f"Completed {algo_name} for level {level}")
     
-    print("Statistics saved to statistics.txt")
+    print("Statistics saved to stat/statistics.txt")
 
 def main():
     pygame.init()
@@ -0,0 +1,71 @@
+from array import array
+
+# move directions, stored in the arena as their index in this list
+MOVES = [(1, 0), (-1, 0), (0, -1), (0, 1)]
+
+
+class NodeArena:
+	"""
+	Compact storage of the search tree: every node is an index into parallel arrays
+
+	Attributes:
+		parents (array): The parent node of each node, -1 for the root.
+		boxes (array): The cell of the box pushed to reach each node.
+		moves (array): The direction of that push, as an index into MOVES.
+
+	Description:
+		Queue and heap entries only carry the node index, the pushes of a node are
+		rebuilt by following the parent pointers once, when the solution is found.
+	"""
+	def __init__(self):
+		self.parents = array('i', [-1])
+		self.boxes = array('i', [-1])
+		self.moves = array('b', [-1])
+
+	def __len__(self):
+		return len(self.parents)
+
+	def add_root(self):
+		"""
+		Add another root node, for searches that start from several states
+
+		Returns:
+			int: The new root node.
+		"""
+		self.parents.append(-1)
+		self.boxes.append(-1)
+		self.moves.append(-1)
+		return len(self.parents) - 1
+
+	def add(self, parent, box, move):
+		"""
+		Add a node reached from parent by pushing box in a direction
+
+		Parameters:
+			parent (int): The parent node.
+			box (int): The cell of the pushed box.
+			move (tuple): The push direction (x, y).
+
+		Returns:
+			int: The new node.
+		"""
+		self.parents.append(parent)
+		self.boxes.append(box)
+		self.moves.append(MOVES.index(move))
+		return len(self.parents) - 1
+
+	def pushes(self, node):
+		"""
+		Rebuild the pushes from the root to a node
+
+		Parameters:
+			node (int): The node.
+
+		Returns:
+			list: The (box, move) pushes in order.
+		"""
+		pushes = []
+		while self.parents[node] >= 0:
+			pushes.append((self.boxes[node], MOVES[self.moves[node]]))
+			node = self.parents[node]
+		return pushes[::-1]
@@ -0,0 +1,32 @@
+import pygame
+
+# size of a cell of the puzzle in pixels
+TILE = 64
+
+_images = {}
+
+
+def image(name, size=(TILE, TILE)):
+    """
+    Load an image of img/ once per process, scaled and converted to the display format
+
+    Parameters:
+        name (str): The file in img/ (e.g: 'box.png').
+        size (tuple): The size (width, height) of the surface. Defaults to a cell.
+
+    Returns:
+        pygame.Surface: The image, shared by every caller so it must not be drawn on.
+
+    Description:
+        An image loaded before the display mode is set can't be converted. It is cached
+        apart and loaded again (converted) once the display exists.
+    """
+    converted = pygame.display.get_surface() is not None
+    key = name, tuple(size), converted
+    surface = _images.get(key)
+    if surface is None:
+        surface = pygame.transform.scale(pygame.image.load(f'img/{name}'), size)
+        if converted:
+            surface = surface.convert_alpha() if surface.get_flags() & pygame.SRCALPHA else surface.convert()
+        _images[key] = surface
+    return surface
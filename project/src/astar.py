@@ -1,52 +1,86 @@
 import time
-from collections import defaultdict
+from functools import partial
 from heapq import heappop, heappush
 
 import numpy as np
-import pygame
 
-from .utils import (can_move, dijkstra_sum, get_state, is_deadlock, is_solved,
-                    manhattan_sum, print_state)
-
-def astar(matrix, player_pos, widget=None, visualizer=False, heuristic='manhattan'):
+from .arena import NodeArena
+from .cache import cached
+from .deadlock import DEFAULT_CHECKS, DeadlockDetector
+from .level import Level
+from .hdastar import solve_hdastar
+from .heuristics import make_heuristic
+from .stats import SearchStats
+from .symmetry import LevelSymmetry
+from .utils import is_solved, normalize, push_moves, rebuild_path
+from .zobrist import TABLE_MEMORY, TranspositionTable, Zobrist
+
+# priority of a node in each search mode
+MODES = {
+	'astar': lambda g, h, weight: g + h,
+	'weighted': lambda g, h, weight: g + weight * h,
+	'greedy': lambda g, h, weight: h,
+}
+
+
+def astar(matrix, player_pos, progress=None, heuristic='manhattan',
+		  memory=TABLE_MEMORY, checks=DEFAULT_CHECKS, mode='astar', weight=2, stats=None, symmetry=False):
 	"""
 	Use A* algorithm to find the optimal path to solve sokoban puzzle
 
 	Parameters:
 		matrix (numpy.ndarray): sokoban puzzle matrix, 2D numpy array (height, width)
 		player_pos (tuple): player position in the matrix (x, y)
-		widget (Widget, optional): pygame widget to display the solution. Defaults to None.
-		visualizer (bool, optional): flag to enable or disable the visualizer. Defaults to False.
-		heuristic (str, optional): heuristic to use, 'manhattan' or 'dijkstra'. Defaults to 'manhattan'.
+		progress (Progress, optional): observer notified of the pushes so far and of the result. Defaults to None.
+		heuristic (str, optional): heuristic to use, 'manhattan', 'dijkstra' or 'matching'. Defaults to 'manhattan'.
+		memory (int, optional): memory budget of the seen states table in bytes. Defaults to TABLE_MEMORY.
+		checks (iterable, optional): names of the deadlock checks to run. Defaults to DEFAULT_CHECKS.
+		mode (str, optional): 'astar' (f = g + h), 'weighted' (f = g + weight * h) or 'greedy' (f = h). Defaults to 'astar'.
+		weight (float, optional): weight of the heuristic in 'weighted' mode. Defaults to 2.
+		stats (SearchStats, optional): counters to fill during the search. Defaults to None.
+		symmetry (bool, optional): states mirrored by a symmetry of the level share their seen entry. Defaults to False.
 
 	Returns:
 		tuple: solution path as a string and depth 
+
+	Description:
+		g is the number of pushes and h a lower bound of the pushes left, so 'astar' mode
+		returns a push-optimal solution. The best g of every state is kept in the seen table:
+		children already reached at a better or equal g are dropped when they are generated,
+		and heap entries made stale by a better path are skipped when popped (lazy deletion).
 	"""
 
 	# print the heuristic
-	print(f'A* - {heuristic.title()} Heuristic')
-	heur = '[A*]' if heuristic == 'manhattan' else '[Dijkstra]'
-	shape = matrix.shape
-
-	# initial state
-	initial_state = get_state(matrix)
-	initial_cost = curr_depth = 0
-
-	# select manhattan or dijkstra heuristic
-	if heuristic == 'manhattan':
-		curr_cost = manhattan_sum(initial_state, player_pos, shape)
-	else:
-		distances = defaultdict(lambda: [])
-		curr_cost = dijkstra_sum(initial_state, player_pos, shape, distances)
-
-	# init a set to mark seen states and a heap (priority queue - min heap)
-	seen = {None}
+	print(f'A* - {heuristic.title()} Heuristic ({mode})')
+	heur = {'manhattan': '[A*]', 'dijkstra': '[Dijkstra]', 'matching': '[Matching]'}.get(heuristic)
+	if mode not in MODES:
+		raise ValueError(f'Invalid search mode: {mode}')
+	priority = MODES[mode]
+	stats = stats if stats is not None else SearchStats()
+
+	# static level and initial state (player cell and box cells)
+	level = Level(matrix)
+	initial_state = level.initial._replace(player=level.cell(player_pos))
+
+	# select manhattan, dijkstra or matching heuristic
+	estimate = make_heuristic(level, heuristic)
+
+	# deadlock checks, counting the hits of each check
+	deadlocks = DeadlockDetector(level, checks)
+
+	# push generation, deadlock checks and heuristic, timed if stats.timing
+	moves = stats.timed('push_moves', push_moves, iterate=True)
+	is_deadlock = stats.timed('is_deadlock', deadlocks)
+	estimate = stats.timed('heuristic', estimate)
+
+	# init a table of the best g-value (pushes) of seen states and a heap (priority queue - min heap)
+	zobrist = Zobrist(level)
+	state_key = partial(LevelSymmetry(level).key, zobrist) if symmetry else zobrist.hash
+	seen = TranspositionTable(memory, replace='depth')
 	heap = []
-	
-	# initial state to the heap
-	heappush(heap, (initial_cost, curr_cost, initial_state, player_pos, curr_depth, ''))
 
-	moves = [(1, 0), (-1, 0), (0, -1), (0, 1)]
+	# parent pointers and pushes of every node, the root is node 0
+	arena = NodeArena()
 	direction = {
 		(1, 0): 'D',
 		(-1, 0): 'U', 
@@ -54,72 +88,94 @@ def astar(matrix, player_pos, widget=None, visualizer=False, heuristic='manhatta
 		(0, 1): 'R',
 	}
 
+	# initial state to the heap, nodes are box configurations with a normalized player
+	# heap entries: (f, h, insertion order, g, state, boxes hash, node)
+	start_state = normalize(level, initial_state)
+	start_hash = zobrist.boxes_hash(start_state.boxes)
+	h = estimate(start_state, None, None, None)
+	stats.evaluations += 1
+	seen.put(state_key(start_state, start_hash), 0)
+	heappush(heap, (priority(0, h, weight), h, 0, 0, start_state, start_hash, 0))
+	g = 0
+
 	while heap:
-		# check for pygame events
-		if widget:
-			pygame.event.pump()
-		
-		# pop the smallest cost node
-		_, curr_cost, state, pos, depth, path = heappop(heap)
-
-		# seen flag
-		seen.add(state)
-
-		for move in moves:
-			# skip seen states and deadlocks
-			new_state, move_cost = can_move(state, shape, pos, move)
-			deadlock = is_deadlock(new_state, shape)
-			if new_state in seen or deadlock:
+		# pop the smallest f node, skip it if a better path to its state was found since
+		_, _, _, g, state, boxes_hash, parent = heappop(heap)
+		best = seen.get(state_key(state, boxes_hash))
+		if best is not None and best < g:
+			continue
+		stats.expanded += 1
+		if stats.timeline and stats.expanded % stats.timeline == 0:
+			stats.sample(len(heap))
+
+		# notify the observer with the pushes so far
+		if progress is not None and progress.due():
+			path = ''.join(direction[push] for _, push in arena.pushes(parent))
+			progress.report(heur, g, path, stats)
+
+		# check if the solution is found, rebuild the walking path between pushes
+		if is_solved(level, state):
+			path = rebuild_path(level, initial_state, arena.pushes(parent))
+			stats.deadlocks = dict(deadlocks.hits)
+			print(f'{heur} Solution found!\n\n{path}\nDepth {len(path)}\nPushes {g}\n'
+				  f'Nodes: {stats}\nDeadlocks: {deadlocks}\n')
+			if progress is not None:
+				progress.finish(heur, path, len(path), stats)
+			return (path, len(path))
+
+		for box, move, new_state, _ in moves(level, state):
+			stats.generated += 1
+			# update the hash of the boxes in O(1)
+			step = level.offset(move)
+			new_hash = zobrist.push(boxes_hash, box, step)
+			key = state_key(new_state, new_hash)
+
+			# duplicate detection at generation: drop states already reached with a better or equal g-value
+			best = seen.get(key)
+			if best is not None and best <= g + 1:
+				stats.duplicates += 1
+				continue
+			if is_deadlock(new_state, box + step):
 				continue
 
-			# calculate new position and cost
-			new_pos = pos[0] + move[0], pos[1] + move[1]
-			if heuristic == 'manhattan':
-				new_cost = manhattan_sum(new_state, new_pos, shape)
-			else:
-				new_cost = dijkstra_sum(new_state, new_pos, shape, distances)
-
-			# skip infinity state
-			if new_cost == float('inf'):
+			# skip infinity state (no goal left for a box)
+			h = estimate(new_state, state, box, box + step)
+			stats.evaluations += 1
+			if h == float('inf'):
 				continue
 
-			# push the new state onto the heap
-			heappush(heap, (
-				move_cost + curr_cost,
-				new_cost,
-				new_state,
-				new_pos,
-				depth + 1,
-				path + direction[move],
-			))
-
-			# check if the solution is found
-			if is_solved(new_state):
-				print(f'{heur} Solution found!\n\n{path + direction[move]}\nDepth {depth + 1}\n')
-				if widget and visualizer:
-					widget.solved = True
-					widget.set_text(f'{heur} Solution Found!\n{path + direction[move]}', 20)
-					pygame.display.update()
-				return (path + direction[move], depth + 1)
-			
-			# update visualizer if enabled
-			if widget and visualizer:
-				widget.set_text(f'{heur} Solution Depth: {depth + 1}\n{path + direction[move]}', 20)
-				pygame.display.update()
-
-	# solution not found			
-	print(f'{heur} Solution not found!\n')
-	if widget and visualizer:
-		widget.set_text(f'{heur} Solution Not Found!\nDepth {depth + 1}', 20)
-		pygame.display.update()
-	return (None, -1 if not heap else depth + 1)
+			# record the best g-value and push the new state onto the heap,
+			# a state seen before with a worse g-value is reopened
+			stats.reopened += best is not None
+			seen.put(key, g + 1)
+			node = arena.add(parent, box, move)
+			heappush(heap, (priority(g + 1, h, weight), h, node, g + 1, new_state, new_hash, node))
+
+	# solution not found
+	stats.deadlocks = dict(deadlocks.hits)
+	print(f'{heur} Solution not found!\nNodes: {stats}\nDeadlocks: {deadlocks}\n')
+	if progress is not None:
+		progress.finish(heur, None, g + 1, stats)
+	return (None, -1)
 
 # Read the sokoban puzzle matrix and player position
-def solve_astar(puzzle, widget=None, visualizer=False, heuristic='manhattan'):
-	matrix = puzzle
-	where = np.where((matrix == '*') | (matrix == '%'))
-	player_pos = where[0][0], where[1][0]
-	return astar(matrix, player_pos, widget, visualizer, heuristic)
+# with several workers (None: one per CPU) the optimal search runs on hdastar,
+# the solution cache is consulted first (cache=False bypasses it)
+def solve_astar(puzzle, progress=None, heuristic='manhattan', memory=TABLE_MEMORY,
+				checks=DEFAULT_CHECKS, mode='astar', weight=2, stats=None, workers=1, cache=None, symmetry=False):
+	if workers != 1 and mode != 'astar':
+		raise ValueError(f'Search mode {mode} does not run on several workers')
+
+	def solve():
+		if workers != 1:
+			return solve_hdastar(puzzle, heuristic, workers, memory, checks, stats=stats, progress=progress, symmetry=symmetry)
+		matrix = puzzle
+		where = np.where((matrix == '*') | (matrix == '%'))
+		player_pos = where[0][0], where[1][0]
+		return astar(matrix, player_pos, progress, heuristic, memory, checks, mode, weight, stats, symmetry)
+
+	algorithm = f'astar-{heuristic}' + {'astar': '', 'weighted': f'-weighted-{weight}', 'greedy': '-greedy'}.get(mode, f'-{mode}')
+	return cached(cache, puzzle, algorithm, solve, stats, progress)
 
 if __name__ == '__main__':
 	start = time.time()
@@ -0,0 +1,243 @@
+"""
+Benchmark of the solvers over the level corpus and a fixed set of generated levels
+
+Usage:
+	python -m src.benchmark --json bench.json --csv bench.csv
+	python -m src.benchmark --configs astar-matching idastar-matching --baseline bench.json
+
+Every solver configuration runs on every level in a fresh process: warm-up runs, then
+repeated timed runs. The peak RSS of that process is the peak of the level.
+"""
+import argparse
+import contextlib
+import csv
+import glob
+import io
+import json
+import math
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+
+from .generator import generate
+from .solve import solve_level
+
+# solver configurations, name -> keyword arguments of solve.solve_level
+CONFIGS = {
+	'bfs': {'algorithm': 'bfs'},
+	# parallel_bfs, states_per_second against bfs shows the scaling with the workers
+	'bfs-2workers': {'algorithm': 'bfs', 'workers': 2},
+	'bfs-4workers': {'algorithm': 'bfs', 'workers': 4},
+	'astar-manhattan': {'algorithm': 'astar', 'heuristic': 'manhattan'},
+	'astar-dijkstra': {'algorithm': 'astar', 'heuristic': 'dijkstra'},
+	'astar-matching': {'algorithm': 'astar', 'heuristic': 'matching'},
+	'greedy-matching': {'algorithm': 'astar', 'heuristic': 'matching', 'mode': 'greedy'},
+	'idastar-matching': {'algorithm': 'idastar', 'heuristic': 'matching'},
+	'bidirectional': {'algorithm': 'bidirectional'},
+}
+# seeds of the generated levels, the same seed always generates the same level
+SEEDS = range(1, 6)
+# columns of a result
+FIELDS = ('level', 'config', 'status', 'depth', 'expanded', 'generated', 'states_per_second',
+		  'peak_rss', 'median', 'p95', 'runs')
+
+
+def percentile(values, fraction):
+	"""Nearest-rank percentile of a list of values (e.g: fraction=0.95 for p95)"""
+	values = sorted(values)
+	return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def generated_levels(seeds=SEEDS, directory=None):
+	"""
+	Generate a level per seed with generator.generate
+
+	Parameters:
+		seeds (iterable): The seeds. Defaults to SEEDS.
+		directory (str): Where the levels are saved, a new temporary directory if None (left to the
+			caller to remove). Defaults to None.
+
+	Returns:
+		list: The level files, seed{seed}.dat.
+	"""
+	directory = directory or tempfile.mkdtemp(prefix='sokoban-bench-')
+	paths = []
+	for seed in seeds:
+		path = os.path.join(directory, f'seed{seed}.dat')
+		with contextlib.redirect_stdout(io.StringIO()):
+			generate(seed=seed, path=path)
+		paths.append(path)
+	return paths
+
+
+def _measure(path, options, warmup, repeats, conn):
+	"""Worker process: warm-up runs, then timed runs of one configuration on one level"""
+	try:
+		for _ in range(warmup):
+			solve_level(path, **options)
+		runs = [solve_level(path, **options) for _ in range(repeats)]
+	except MemoryError:
+		conn.send({'status': 'memory'})
+	except Exception as e:
+		conn.send({'status': 'error', 'error': f'{type(e).__name__}: {e}'})
+	else:
+		times = [run['wall_time'] for run in runs]
+		median = statistics.median(times)
+		last = runs[-1]
+		conn.send({
+			'status': last['status'],
+			'depth': last['depth'],
+			'expanded': last['expanded'],
+			'generated': last['generated'],
+			'states_per_second': round(last['expanded'] / median) if median else None,
+			'peak_rss': max(run['peak_memory'] for run in runs),
+			'median': round(median, 5),
+			'p95': round(percentile(times, 0.95), 5),
+			'runs': len(times),
+		})
+	conn.close()
+
+
+def benchmark(paths, configs=None, warmup=1, repeats=5, time_limit=None, output=sys.stdout):
+	"""
+	Run every configuration on every level
+
+	Parameters:
+		paths (list): The level files.
+		configs (iterable): Names of the configurations in CONFIGS. Defaults to every configuration.
+		warmup (int): Untimed runs before the timed ones. Defaults to 1.
+		repeats (int): Timed runs. Defaults to 5.
+		time_limit (float): Seconds for all the runs of a level, None for no limit. Defaults to None.
+		output (file): Where the progress is printed. Defaults to sys.stdout.
+
+	Returns:
+		list: One result per level and configuration, a dict with the FIELDS. A level over
+			the time limit has the status 'timeout' and no measures.
+
+	Description:
+		The levels run one at a time so the runs don't compete for the CPU. The node counts
+		are the same on every run, the solution cache is never used.
+	"""
+	names = list(CONFIGS if configs is None else configs)
+	for name in names:
+		if name not in CONFIGS:
+			raise ValueError(f'Invalid configuration: {name}')
+	if repeats < 1:
+		raise ValueError(f'Invalid number of runs: {repeats}')
+
+	results = []
+	for name in names:
+		for path in paths:
+			conn, child_conn = multiprocessing.Pipe(duplex=False)
+			# not daemonic, the search may start its own workers
+			process = multiprocessing.Process(
+				target=_measure, args=(path, CONFIGS[name], warmup, repeats, child_conn))
+			process.start()
+			child_conn.close()
+			if conn.poll(time_limit):
+				try:
+					result = conn.recv()
+				except EOFError:
+					result = {'status': 'error'}
+			else:
+				process.terminate()
+				result = {'status': 'timeout'}
+			process.join()
+			conn.close()
+			result = {'level': os.path.basename(path), 'config': name, **result}
+			results.append(result)
+			print(f'{name:<18} {result["level"]:<12} {result["status"]:<10} '
+				  f'median {result.get("median")}s p95 {result.get("p95")}s expanded {result.get("expanded")}',
+				  file=output, flush=True)
+	return results
+
+
+def write_csv(results, path):
+	with open(path, 'w', newline='') as f:
+		writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction='ignore')
+		writer.writeheader()
+		writer.writerows(results)
+
+
+def write_json(results, path):
+	with open(path, 'w') as f:
+		json.dump(results, f, indent=1)
+
+
+def compare(results, baseline, tolerance=0.2):
+	"""
+	Find the regressions of results against a baseline
+
+	Parameters:
+		results (list): Results of benchmark.
+		baseline (list): Results of an earlier benchmark (e.g: loaded from its JSON file).
+		tolerance (float): Relative slowdown of the median time allowed. Defaults to 0.2.
+
+	Returns:
+		list: One message per regression: a level no longer solved, more nodes expanded,
+			a different depth or a median time over the tolerance.
+	"""
+	old = {(result['level'], result['config']): result for result in baseline}
+	regressions = []
+	for result in results:
+		before = old.get((result['level'], result['config']))
+		if before is None:
+			continue
+		name = f'{result["config"]} {result["level"]}'
+		if result['status'] != before['status']:
+			if before['status'] in ('solved', 'unsolvable'):
+				regressions.append(f'{name}: {before["status"]} -> {result["status"]}')
+			continue
+		if result['status'] not in ('solved', 'unsolvable'):
+			continue
+		if result['depth'] != before['depth']:
+			regressions.append(f'{name}: depth {before["depth"]} -> {result["depth"]}')
+		if result['expanded'] > before['expanded']:
+			regressions.append(f'{name}: expanded {before["expanded"]} -> {result["expanded"]}')
+		if result['median'] > before['median'] * (1 + tolerance):
+			regressions.append(f'{name}: median {before["median"]}s -> {result["median"]}s')
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog='python -m src.benchmark', description=__doc__.strip().split('\n')[0])
+	parser.add_argument('levels', nargs='*', default=['levels/*.dat'], help="level files or glob patterns (default: 'levels/*.dat')")
+	parser.add_argument('-c', '--configs', nargs='+', choices=CONFIGS, default=None, help='solver configurations (default: all)')
+	parser.add_argument('-s', '--seeds', type=int, nargs='*', default=list(SEEDS), help='seeds of the generated levels')
+	parser.add_argument('-w', '--warmup', type=int, default=1, help='untimed runs per level')
+	parser.add_argument('-r', '--repeats', type=int, default=5, help='timed runs per level')
+	parser.add_argument('-t', '--time-limit', type=float, default=60, help='seconds for all the runs of a level')
+	parser.add_argument('--csv', help='write the results to a CSV file')
+	parser.add_argument('--json', help='write the results to a JSON file')
+	parser.add_argument('--baseline', help='JSON results to compare against')
+	parser.add_argument('--tolerance', type=float, default=0.2, help='relative slowdown of the median allowed')
+	args = parser.parse_args(argv)
+
+	paths = []
+	for pattern in args.levels:
+		paths.extend(sorted(glob.glob(pattern)) or [pattern])
+	# lvl0.dat is overwritten by every random game of the GUI
+	paths = [path for path in paths if os.path.basename(path) != 'lvl0.dat']
+
+	# the generated levels only live for the runs
+	with tempfile.TemporaryDirectory(prefix='sokoban-bench-') as directory:
+		paths += generated_levels(args.seeds, directory)
+		results = benchmark(paths, args.configs, args.warmup, args.repeats, args.time_limit)
+	if args.csv:
+		write_csv(results, args.csv)
+	if args.json:
+		write_json(results, args.json)
+	if args.baseline:
+		with open(args.baseline) as f:
+			regressions = compare(results, json.load(f), args.tolerance)
+		for regression in regressions:
+			print(f'[Regression] {regression}')
+		print(f'{len(regressions)} regressions against {args.baseline}')
+		if regressions:
+			sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
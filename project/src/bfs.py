@@ -1,41 +1,74 @@
 import time
 from collections import deque
+from functools import partial
 
 import numpy as np
-import pygame
 
-from .utils import can_move, get_state, is_deadlock, is_solved, print_state
+from .arena import NodeArena
+from .cache import cached
+from .deadlock import DEFAULT_CHECKS, DeadlockDetector
+from .level import Level
+from .parallel_bfs import solve_parallel_bfs
+from .stats import SearchStats
+from .symmetry import LevelSymmetry
+from .utils import (get_state, is_solved, normalize, print_state, push_moves,
+                    rebuild_path)
+from .zobrist import TABLE_MEMORY, TranspositionTable, Zobrist
 
 
-def bfs(matrix, player_pos, widget=None, visualizer=False):
+def bfs(matrix, player_pos, progress=None, memory=TABLE_MEMORY,
+		checks=DEFAULT_CHECKS, symmetry=False, stats=None):
 	"""
-	Use Breadth-First Search to solve the Sokoban puzzle.
+	Use Breadth-First Search over box pushes to solve the Sokoban puzzle.
 
 	Parameters:
 		matrix (np.ndarray): The Sokoban puzzle, 2D numpy array. (height, width)
 		player_pos (tuple): The player's position. (x, y)
-		widget (Widget): The widget to display the solution. default is None. 
-		visualizer (bool): Whether to visualize the solution. default is False.
+		progress (Progress): Observer notified of the pushes so far and of the result. default is None.
+		memory (int): Memory budget of the seen states table in bytes. default is TABLE_MEMORY.
+		checks (iterable): Names of the deadlock checks to run. default is DEFAULT_CHECKS.
+		symmetry (bool): Whether states mirrored by a symmetry of the level are seen once. default is False.
+		stats (SearchStats): Counters to fill during the search. default is None.
 
 	Returns:
 		tuple: The solution path as a string and depth.
+
+	Description:
+		A node is a box configuration with the player normalized to its reachable region,
+		so the search is shortest in pushes. The walking path between pushes is rebuilt
+		once the solution is found.
 	"""
 
 	print('Breadth-First Search')
+	stats = stats if stats is not None else SearchStats()
 
-	# Get the initial state
-	initial_state = get_state(matrix)
-	shape = matrix.shape
+	# Get the static level and the initial state (player cell and box cells)
+	level = Level(matrix)
+	initial_state = level.initial._replace(player=level.cell(player_pos))
 
 	# Print the initial state
-	print_state(initial_state, shape)
-
-	seen = {None}
-	q = deque([(initial_state, player_pos, 0, '')])
-
-	moves = [(1, 0), (-1, 0), (0, -1), (0, 1)]
-
-	curr_depth = 0
+	print_state(get_state(matrix), matrix.shape)
+
+	# deadlock checks, counting the hits of each check
+	deadlocks = DeadlockDetector(level, checks)
+
+	# push generation and deadlock checks, timed if stats.timing
+	moves = stats.timed('push_moves', push_moves, iterate=True)
+	is_deadlock = stats.timed('is_deadlock', deadlocks)
+
+	# mark states seen when they are generated so duplicates never enter the queue,
+	# seen states are Zobrist hashes in a fixed-size table
+	zobrist = Zobrist(level)
+	state_key = partial(LevelSymmetry(level).key, zobrist) if symmetry else zobrist.hash
+	seen = TranspositionTable(memory)
+	start_state = normalize(level, initial_state)
+	start_hash = zobrist.boxes_hash(start_state.boxes)
+	seen.put(state_key(start_state, start_hash), 0)
+	q = deque([(start_state, start_hash, 0, 0)])
+
+	curr_depth = depth = 0
+	# parent pointers and pushes of every node, the root is node 0
+	arena = NodeArena()
 	direction = {
 		(1, 0): 'D',
 		(-1, 0): 'U', 
@@ -44,65 +77,67 @@ def bfs(matrix, player_pos, widget=None, visualizer=False):
 	}
 
 	while q:
-		# check for pygame events
-		if widget:
-			pygame.event.pump()
-		
-		# Get the current state, position, depth, and path from the head of the queue
-		state, pos, depth, path = q.popleft()
+		# Get the current state, depth (pushes), and node from the head of the queue
+		state, boxes_hash, depth, parent = q.popleft()
+		stats.expanded += 1
+		if stats.timeline and stats.expanded % stats.timeline == 0:
+			stats.sample(len(q))
+
+		# notify the observer with the pushes so far
+		if progress is not None and progress.due():
+			path = ''.join(direction[push] for _, push in arena.pushes(parent))
+			progress.report('[BFS]', depth, path, stats)
 
 		# tracking the depth
 		if depth != curr_depth:
 			print(f'Depth: {depth}')
 			curr_depth = depth
 
-		# track the seen states
-		seen.add(state)
-
-		for move in moves:
-			# check valid move
-			new_state, _ = can_move(state, shape, pos, move)
-			deadlock = is_deadlock(new_state, shape)
-			if new_state in seen or deadlock:
+		for box, move, new_state, _ in moves(level, state):
+			# update the hash of the boxes in O(1), skip seen states and deadlocks
+			stats.generated += 1
+			step = level.offset(move)
+			new_hash = zobrist.push(boxes_hash, box, step)
+			key = state_key(new_state, new_hash)
+			if seen.get(key) is not None:
+				stats.duplicates += 1
+				continue
+			if is_deadlock(new_state, box + step):
 				continue
-			
-			new_pos = pos[0] + move[0], pos[1] + move[1]
-
-			# add the new state, position, depth, and path to the tail of the queue
-			q.append((
-				new_state, 
-				new_pos,
-				depth + 1,
-				path + direction[move],
-			))
-
-			# check the solution is found
-			if is_solved(new_state):
-				print(f'[BFS] Solution found!\n\n{path + direction[move]}\nDepth {depth + 1}\n')
-				if widget and visualizer:
-					widget.solved = True
-					widget.set_text(f'[BFS] Solution Found!\n{path + direction[move]}', 20)
-					pygame.display.update()
-				return (path + direction[move], depth + 1)
-			
-			# update the widget and visualizer
-			if widget and visualizer:
-				widget.set_text(f'[BFS] Solution Depth: {depth + 1}\n{path + direction[move]}', 20)
-				pygame.display.update()
+
+			# track the seen states, add the new state, depth, and node to the tail of the queue
+			seen.put(key, depth + 1)
+			node = arena.add(parent, box, move)
+			q.append((new_state, new_hash, depth + 1, node))
+
+			# check the solution is found, rebuild the walking path between pushes
+			if is_solved(level, new_state):
+				path = rebuild_path(level, initial_state, arena.pushes(node))
+				stats.deadlocks = dict(deadlocks.hits)
+				print(f'[BFS] Solution found!\n\n{path}\nDepth {len(path)}\nNodes: {stats}\nDeadlocks: {deadlocks}\n')
+				if progress is not None:
+					progress.finish('[BFS]', path, len(path), stats)
+				return (path, len(path))
 
 	# solution not found
-	print(f'[BFS] Solution not found!\n')
-	if widget and visualizer:
-		widget.set_text(f'[BFS] Solution Not Found!\nDepth {depth + 1}', 20)
-		pygame.display.update()
+	stats.deadlocks = dict(deadlocks.hits)
+	print(f'[BFS] Solution not found!\nNodes: {stats}\nDeadlocks: {deadlocks}\n')
+	if progress is not None:
+		progress.finish('[BFS]', None, depth + 1, stats)
 	return (None, -1 if not q else depth + 1)
 
-# get player position and call bfs
-def solve_bfs(puzzle, widget=None, visualizer=False):
-	matrix = puzzle
-	where = np.where((matrix == '*') | (matrix == '%'))
-	player_pos = where[0][0], where[1][0]
-	return bfs(matrix, player_pos, widget, visualizer)
+# get player position and call bfs, or parallel_bfs with several workers (None: one per CPU),
+# the solution cache is consulted first (cache=False bypasses it)
+def solve_bfs(puzzle, progress=None, memory=TABLE_MEMORY, checks=DEFAULT_CHECKS, workers=1,
+			  cache=None, symmetry=False, stats=None):
+	def solve():
+		if workers != 1:
+			return solve_parallel_bfs(puzzle, workers, memory, checks, progress, symmetry, stats)
+		matrix = puzzle
+		where = np.where((matrix == '*') | (matrix == '%'))
+		player_pos = where[0][0], where[1][0]
+		return bfs(matrix, player_pos, progress, memory, checks, symmetry, stats)
+	return cached(cache, puzzle, 'bfs', solve, stats, progress)
 
 	
 if __name__ == '__main__':
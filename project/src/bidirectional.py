@@ -0,0 +1,195 @@
+import time
+
+import numpy as np
+
+from .arena import NodeArena
+from .deadlock import DEFAULT_CHECKS, DeadlockDetector
+from .level import Level, State
+from .stats import SearchStats
+from .utils import (is_solved, normalize, pull_moves, push_moves, reachable,
+                    rebuild_path)
+from .zobrist import TABLE_MEMORY, TranspositionTable, Zobrist
+
+
+def solved_states(level):
+	"""
+	Find the solved states of a level: every box on a goal, one state per player region
+
+	Parameters:
+		level (Level): The static level (walls and goals).
+
+	Returns:
+		list: The solved states with a normalized player cell. Only the regions next to
+			a box are kept, the player ends next to the box of the last push.
+	"""
+	goals = tuple(sorted(level.goals))
+	steps = (level.width, -level.width, -1, 1)
+	states, seen = [], set()
+	for cell, wall in enumerate(level.walls):
+		if wall or cell in level.goals or cell in seen:
+			continue
+		region = reachable(level, State(cell, goals))
+		seen |= region
+		if any(cell + step in level.goals for cell in region for step in steps):
+			states.append(State(min(region), goals))
+	return states
+
+
+def bidirectional(matrix, player_pos, progress=None, memory=TABLE_MEMORY,
+				  checks=DEFAULT_CHECKS, stats=None):
+	"""
+	Use bidirectional Breadth-First Search to solve the Sokoban puzzle:
+	forward pushes from the initial state meet backward pulls from the solved states.
+
+	Parameters:
+		matrix (np.ndarray): The Sokoban puzzle, 2D numpy array. (height, width)
+		player_pos (tuple): The player's position. (x, y)
+		progress (Progress): Observer notified of the forward pushes so far and of the result. default is None.
+		memory (int): Memory budget of each side's seen states table in bytes. default is TABLE_MEMORY.
+		checks (iterable): Names of the deadlock checks of the forward side. default is DEFAULT_CHECKS.
+		stats (SearchStats): Counters to fill during the search. default is None.
+
+	Returns:
+		tuple: The solution path as a string and depth.
+
+	Description:
+		Each side keeps a seen table of Zobrist keys -> nodes of its own arena. The side
+		with the smaller frontier expands one whole layer, every new state is looked up in
+		the other side's table and the shortest meeting of the layer is kept. Both sides
+		normalize the player to its reachable region, so equal keys are the same node.
+		The pulls from the solved state to the meeting state are reversed into pushes and
+		the walking path is rebuilt as in bfs.
+	"""
+
+	print('Bidirectional Search')
+	stats = stats if stats is not None else SearchStats()
+
+	# Get the static level and the initial state (player cell and box cells)
+	level = Level(matrix)
+	initial_state = level.initial._replace(player=level.cell(player_pos))
+	if len(level.goals) != len(initial_state.boxes):
+		raise ValueError('Bidirectional search needs as many goals as boxes')
+
+	# deadlock checks of the forward side, pulled states can always be pushed back
+	deadlocks = DeadlockDetector(level, checks)
+	is_deadlock = stats.timed('is_deadlock', deadlocks)
+	zobrist = Zobrist(level)
+	direction = {
+		(1, 0): 'D',
+		(-1, 0): 'U',
+		(0, -1): 'L',
+		(0, 1): 'R',
+	}
+
+	# forward side from the initial state
+	start_state = normalize(level, initial_state)
+	if is_solved(level, start_state):
+		print('[Bidirectional] Solution found!\n\n\nDepth 0\n')
+		if progress is not None:
+			progress.finish('[Bidirectional]', '', 0, stats)
+		return ('', 0)
+	start_hash = zobrist.boxes_hash(start_state.boxes)
+	forward = {
+		'arena': NodeArena(),
+		'seen': TranspositionTable(memory),
+		'frontier': [(start_state, start_hash, 0)],
+		'moves': stats.timed('push_moves', lambda state: push_moves(level, state), iterate=True),
+		'depth': 0,
+	}
+	forward['seen'].put(zobrist.hash(start_state, start_hash), 0)
+
+	# backward side from every solved state, each one is a root of the arena
+	goals_hash = zobrist.boxes_hash(sorted(level.goals))
+	backward = {
+		'arena': NodeArena(),
+		'seen': TranspositionTable(memory),
+		'frontier': [],
+		'moves': stats.timed('pull_moves', lambda state: pull_moves(level, state), iterate=True),
+		'depth': 0,
+	}
+	for i, state in enumerate(solved_states(level)):
+		node = backward['arena'].add_root() if i else 0
+		backward['seen'].put(zobrist.hash(state, goals_hash), node)
+		backward['frontier'].append((state, goals_hash, node))
+
+	meeting = None
+	while forward['frontier'] and backward['frontier'] and meeting is None:
+		# expand one layer of the side with the smaller frontier
+		if len(forward['frontier']) <= len(backward['frontier']):
+			side, other = forward, backward
+		else:
+			side, other = backward, forward
+		arena, seen = side['arena'], side['seen']
+		frontier, side['frontier'] = side['frontier'], []
+		side['depth'] += 1
+		print(f'Depth: {forward["depth"]} + {backward["depth"]}')
+
+		for state, boxes_hash, parent in frontier:
+			stats.expanded += 1
+			if stats.timeline and stats.expanded % stats.timeline == 0:
+				stats.sample(len(frontier) + len(side['frontier']) + len(other['frontier']))
+
+			# notify the observer with the forward pushes so far (none while expanding the backward side)
+			if progress is not None and progress.due():
+				pushes = arena.pushes(parent) if side is forward else []
+				path = ''.join(direction[push] for _, push in pushes)
+				progress.report('[Bidirectional]', forward['depth'], path, stats)
+
+			for box, move, new_state, *_ in side['moves'](state):
+				stats.generated += 1
+				step = level.offset(move)
+				new_hash = zobrist.push(boxes_hash, box, step)
+				key = zobrist.hash(new_state, new_hash)
+				if seen.get(key) is not None:
+					stats.duplicates += 1
+					continue
+				if side is forward and is_deadlock(new_state, box + step):
+					continue
+				node = arena.add(parent, box, move)
+				seen.put(key, node)
+				side['frontier'].append((new_state, new_hash, node))
+
+				# meeting test: the state was reached by the other side, keep the shortest meeting
+				other_node = other['seen'].get(key)
+				if other_node is not None:
+					nodes = (node, other_node) if side is forward else (other_node, node)
+					length = len(forward['arena'].pushes(nodes[0])) + len(backward['arena'].pushes(nodes[1]))
+					if meeting is None or length < meeting[0]:
+						meeting = (length, *nodes)
+
+	if meeting is not None:
+		# stitch the pushes to the meeting state and the reversed pulls from the solved state
+		_, forward_node, backward_node = meeting
+		pushes = forward['arena'].pushes(forward_node)
+		for box, move in reversed(backward['arena'].pushes(backward_node)):
+			step = level.offset(move)
+			pushes.append((box + step, (-move[0], -move[1])))
+		path = rebuild_path(level, initial_state, pushes)
+		stats.deadlocks = dict(deadlocks.hits)
+		print(f'[Bidirectional] Solution found!\n\n{path}\nDepth {len(path)}\nPushes {len(pushes)}\n'
+			  f'Nodes: {stats}\nDeadlocks: {deadlocks}\n')
+		if progress is not None:
+			progress.finish('[Bidirectional]', path, len(path), stats)
+		return (path, len(path))
+
+	# solution not found, one side ran out of states
+	stats.deadlocks = dict(deadlocks.hits)
+	print(f'[Bidirectional] Solution not found!\nNodes: {stats}\nDeadlocks: {deadlocks}\n')
+	if progress is not None:
+		progress.finish('[Bidirectional]', None, forward['depth'], stats)
+	return (None, -1)
+
+# get player position and call bidirectional
+def solve_bidirectional(puzzle, progress=None, memory=TABLE_MEMORY,
+						checks=DEFAULT_CHECKS, stats=None):
+	matrix = puzzle
+	where = np.where((matrix == '*') | (matrix == '%'))
+	player_pos = where[0][0], where[1][0]
+	return bidirectional(matrix, player_pos, progress, memory, checks, stats)
+
+
+if __name__ == '__main__':
+	# count the runtime
+	start = time.time()
+	solve_bidirectional(np.loadtxt('levels/lvl7.dat', dtype='<U1'))
+	print(f'Runtime: {time.time() - start} seconds')
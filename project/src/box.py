@@ -1,15 +1,15 @@
 import pygame
 from pygame.sprite import Sprite
 
+from . import assets
+
 
 class Box(Sprite):
     def __init__(self, *groups, x, y, game=None):
         super().__init__(*groups)
         self.game = game
-        self.sprite = pygame.image.load('img/box.png')
-        self.sprite = pygame.transform.scale(self.sprite, [64, 64])
-        self.spriteg = pygame.image.load('img/boxg.png')
-        self.spriteg = pygame.transform.scale(self.spriteg, [64, 64])
+        self.sprite = assets.image('box.png')
+        self.spriteg = assets.image('boxg.png')
         self.image = self.sprite if game and not game.puzzle[y, x].ground else self.spriteg
         self.rect = pygame.Rect(x * 64, y * 64, 64, 64)
         self.x = x
@@ -54,8 +54,7 @@ class Box(Sprite):
 class Obstacle(Box):
     def __init__(self, *groups, x, y):
         super().__init__(*groups, x=x, y=y)
-        self.image = pygame.image.load('img/obs.png')
-        self.image = pygame.transform.scale(self.image, [64, 64])
+        self.image = assets.image('obs.png')
         self.rect = pygame.Rect(x * 64, y * 64, 64, 64)
 
 
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+
+from .level import Level
+from .stats import SearchStats
+from .symmetry import canonical_symmetry, inverse, transform_cell, transform_path
+from .utils import walk
+
+# default directory of the solution cache, SOKOBAN_CACHE_DIR overrides it
+CACHE_DIR = os.environ.get('SOKOBAN_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'sokoban'))
+# default size budget of the cached entries (bytes)
+CACHE_SIZE = 16 * 2**20
+
+
+def canonical_level(matrix):
+	"""
+	Canonical form of a level: walls trimmed and the player normalized to its reachable region
+
+	Parameters:
+		matrix (np.ndarray): The Sokoban puzzle, 2D numpy array. (height, width)
+
+	Returns:
+		tuple: (rows, player, offset)
+			rows (tuple): The trimmed level without the player, one string per row.
+			player (tuple): The smallest cell (row, col) of the player's region in rows.
+			offset (tuple): Position (row, col) of rows[0][0] in matrix.
+
+	Description:
+		Cells the player can never reach (ignoring the boxes) turn into walls unless they
+		hold a box or a goal, then the level is cropped to one wall around what is left.
+		Two levels that only differ by decoration outside the walls or by where the player
+		stands in its region have the same canonical form.
+	"""
+	height, width = matrix.shape
+	chars = {(row, col): matrix[row, col] for row in range(height) for col in range(width)}
+	player = next(cell for cell, char in chars.items() if char in '*%')
+	steps = ((1, 0), (-1, 0), (0, -1), (0, 1))
+
+	def fill(start, blocked):
+		region, stack = {start}, [start]
+		while stack:
+			row, col = stack.pop()
+			for dy, dx in steps:
+				cell = row + dy, col + dx
+				if cell not in region and cell in chars and chars[cell] not in blocked:
+					region.add(cell)
+					stack.append(cell)
+		return region
+
+	# the floor the player can reach ignoring the boxes, the boxes and the goals are kept
+	kept = fill(player, '+') | {cell for cell, char in chars.items() if char in '@X$'}
+	top, bottom = min(row for row, _ in kept) - 1, max(row for row, _ in kept) + 1
+	left, right = min(col for _, col in kept) - 1, max(col for _, col in kept) + 1
+	rows = tuple(
+		''.join(
+			{'*': '-', '%': 'X'}.get(chars[row, col], chars[row, col]) if (row, col) in kept else '+'
+			for col in range(left, right + 1)
+		)
+		for row in range(top, bottom + 1)
+	)
+	region = fill(player, '+@$')
+	row, col = min(region)
+	return rows, (row - top, col - left), (top, left)
+
+
+def level_key(rows, player):
+	"""Hash of a canonical level, see canonical_level"""
+	text = '\n'.join(rows) + f'\n{player[0]},{player[1]}'
+	return hashlib.sha256(text.encode()).hexdigest()
+
+
+class SolutionCache:
+	"""
+	On-disk cache of solutions, keyed by the canonical level hash and the algorithm
+
+	Parameters:
+		directory (str): Directory of the cache database. Defaults to CACHE_DIR.
+		max_size (int): Size budget of the entries in bytes, the least recently used
+			entries are evicted above it. Defaults to CACHE_SIZE.
+
+	Description:
+		Entries live in a SQLite database (solutions.db). The key is the smallest of the 8
+		rotations and mirrors of the canonical level (see symmetry.canonical_symmetry), so a
+		level and its mirror images share one entry. A solution is stored in that frame with
+		the cell (row, col) its path starts from; on a hit both are mapped back to the level
+		and a level with the player elsewhere in the same region gets the walk to that cell
+		in front of the path. A connection is opened per call, so a cache can be shared by processes.
+	"""
+	def __init__(self, directory=CACHE_DIR, max_size=CACHE_SIZE):
+		self.directory = directory
+		self.path = os.path.join(directory, 'solutions.db')
+		self.max_size = max_size
+		os.makedirs(directory, exist_ok=True)
+		with closing(self.connect()) as db, db:
+			db.execute(
+				'CREATE TABLE IF NOT EXISTS solutions ('
+				'key TEXT, algorithm TEXT, origin_row INTEGER, origin_col INTEGER, solution TEXT, '
+				'depth INTEGER, stats TEXT, size INTEGER, used REAL, PRIMARY KEY (key, algorithm))'
+			)
+
+	def connect(self):
+		return sqlite3.connect(self.path, timeout=30)
+
+	def __len__(self):
+		with closing(self.connect()) as db:
+			return db.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+	def get(self, matrix, algorithm):
+		"""
+		Look up the solution of a level
+
+		Parameters:
+			matrix (np.ndarray): The Sokoban puzzle, 2D numpy array. (height, width)
+			algorithm (str): The algorithm that solved it. (e.g: 'bfs', 'astar-matching')
+
+		Returns:
+			tuple: The solution path as a string and depth, None if the level is not cached.
+		"""
+		rows, player, offset = canonical_level(matrix)
+		symmetric_rows, symmetric_player, transform = canonical_symmetry(rows, player)
+		key = level_key(symmetric_rows, symmetric_player)
+		with closing(self.connect()) as db, db:
+			entry = db.execute(
+				'SELECT origin_row, origin_col, solution, depth FROM solutions WHERE key = ? AND algorithm = ?',
+				(key, algorithm),
+			).fetchone()
+			if entry is None:
+				return None
+			db.execute('UPDATE solutions SET used = ? WHERE key = ? AND algorithm = ?', (time.time(), key, algorithm))
+		origin_row, origin_col, solution, depth = entry
+		if solution is None:
+			return (None, depth)
+
+		# map the path back from the canonical frame, walk from the player to the cell it starts from
+		solution = transform_path(solution, inverse(transform))
+		shape = len(symmetric_rows), len(symmetric_rows[0])
+		origin_row, origin_col = transform_cell((origin_row, origin_col), shape, inverse(transform))
+		level = Level(matrix)
+		origin = level.cell((origin_row + offset[0], origin_col + offset[1]))
+		if origin != level.initial.player:
+			solution = walk(level, level.initial, origin) + solution
+		return (solution, len(solution))
+
+	def put(self, matrix, algorithm, solution, depth, stats=None):
+		"""
+		Store the solution of a level, then evict the least recently used entries over the budget
+
+		Parameters:
+			matrix (np.ndarray): The Sokoban puzzle, 2D numpy array. (height, width)
+			algorithm (str): The algorithm that solved it.
+			solution (str): The solution path, None if the level has no solution.
+			depth (int): The depth returned by the solver.
+			stats (dict): Search counters to keep with the solution. Defaults to None.
+		"""
+		rows, player, offset = canonical_level(matrix)
+		symmetric_rows, symmetric_player, transform = canonical_symmetry(rows, player)
+		key = level_key(symmetric_rows, symmetric_player)
+		# the cell the path starts from and the path, in the canonical frame
+		where = np.where((matrix == '*') | (matrix == '%'))
+		origin = int(where[0][0]) - offset[0], int(where[1][0]) - offset[1]
+		origin_row, origin_col = transform_cell(origin, (len(rows), len(rows[0])), transform)
+		if solution is not None:
+			solution = transform_path(solution, transform)
+		stats = json.dumps(stats) if stats is not None else None
+		size = len(key) + len(algorithm) + len(solution or '') + len(stats or '') + 64
+		with closing(self.connect()) as db, db:
+			db.execute(
+				'INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+				(key, algorithm, origin_row, origin_col, solution, depth, stats, size, time.time()),
+			)
+			total = db.execute('SELECT SUM(size) FROM solutions').fetchone()[0]
+			if total > self.max_size:
+				for old_key, old_algorithm, old_size in db.execute(
+					'SELECT key, algorithm, size FROM solutions ORDER BY used').fetchall():
+					db.execute('DELETE FROM solutions WHERE key = ? AND algorithm = ?', (old_key, old_algorithm))
+					total -= old_size
+					if total <= self.max_size:
+						break
+
+	def clear(self):
+		"""Remove every entry"""
+		with closing(self.connect()) as db, db:
+			db.execute('DELETE FROM solutions')
+
+
+_default_cache = None
+
+
+def default_cache():
+	"""The cache in CACHE_DIR used by the solvers, created on first use"""
+	global _default_cache
+	if _default_cache is None:
+		_default_cache = SolutionCache()
+	return _default_cache
+
+
+def cached(cache, puzzle, algorithm, solve, stats=None, progress=None):
+	"""
+	Return the cached solution of a puzzle, or solve it and cache the result
+
+	Parameters:
+		cache (SolutionCache): The cache, None for default_cache(), False to bypass it.
+		puzzle (np.ndarray): The Sokoban puzzle, 2D numpy array. (height, width)
+		algorithm (str): The algorithm name the entry is stored under.
+		solve (callable): Runs the solver, returns (solution, depth).
+		stats (SearchStats): Counters filled by the solver, stored with the solution. Defaults to None.
+		progress (Progress): Observer of the solver, notified of the end of the search on a cache hit. Defaults to None.
+
+	Returns:
+		tuple: The solution path as a string and depth.
+	"""
+	if cache is False:
+		return solve()
+	cache = default_cache() if cache is None else cache
+	entry = cache.get(puzzle, algorithm)
+	if entry is not None:
+		print(f'[Cache] {algorithm} solution found!\n\n{entry[0]}\nDepth {entry[1]}\n')
+		if progress is not None:
+			progress.finish('[Cache]', entry[0], entry[1], stats if stats is not None else SearchStats())
+		return entry
+	solution, depth = solve()
+	cache.put(puzzle, algorithm, solution, depth, stats.as_dict() if stats is not None else None)
+	return (solution, depth)
@@ -0,0 +1,235 @@
+from collections import Counter, deque
+
+
+def push_distances(level):
+	"""
+	Find the number of pushes from every cell to every goal, ignoring the other boxes
+
+	Parameters:
+		level (Level): The static level (walls and goals).
+
+	Returns:
+		dict: goal -> list of the push distance of a box on every cell to that goal,
+			float('inf') if the box can never reach it.
+
+	Description:
+		Reverse "pull" breadth-first search from each goal with unit costs: a box on cell
+		can be pulled to cell + step if cell + step is floor and the player has room to
+		step back to cell + 2 * step.
+	"""
+	walls = level.walls
+	steps = (level.width, -level.width, -1, 1)
+	distances = {}
+	for goal in sorted(level.goals):
+		distance = [float('inf')] * len(walls)
+		distance[goal] = 0
+		q = deque([goal])
+		while q:
+			cell = q.popleft()
+			for step in steps:
+				new_cell = cell + step
+				# new_cell is floor so new_cell + step is at most on the border, still inside the grid
+				if distance[new_cell] == float('inf') and not walls[new_cell] and not walls[new_cell + step]:
+					distance[new_cell] = distance[cell] + 1
+					q.append(new_cell)
+		distances[goal] = distance
+	return distances
+
+
+def box_goals(level):
+	"""
+	Find the goals a box can be pushed to from every cell, ignoring the other boxes
+
+	Parameters:
+		level (Level): The static level (walls, goals and distances).
+
+	Returns:
+		list: For every cell, the tuple of goals reachable by a box on that cell.
+	"""
+	return [
+		tuple(goal for goal, distance in level.distances.items() if distance[cell] < float('inf'))
+		for cell in range(len(level.walls))
+	]
+
+
+def dead_squares(level):
+	"""
+	Find every cell from which a box can never reach any goal
+
+	Parameters:
+		level (Level): The static level (walls, goals and box_goals).
+
+	Returns:
+		bytearray: 1 for every dead floor cell, 0 otherwise (walls and live cells).
+	"""
+	return bytearray(
+		not wall and not goals for wall, goals in zip(level.walls, level.box_goals)
+	)
+
+
+def dead_square_deadlock(level, state, box=None):
+	"""A box is on a cell from which it can never reach a goal"""
+	if box is not None:
+		return bool(level.dead[box])
+	return any(level.dead[box] for box in state.boxes)
+
+
+def freeze_deadlock(level, state, box=None):
+	"""
+	A box that can never move along either axis is not on a goal
+
+	Description:
+		A box is blocked along an axis if there is a wall on either side, if both sides
+		are dead squares, or if a box on either side is frozen itself (checked with the
+		first box treated as a wall). A box is frozen if it is blocked along both axes.
+		Every box frozen together with it must be on a goal. Covers the 2x2 box squares.
+	"""
+	boxes = frozenset(state.boxes)
+	for start in (boxes if box is None else (box,)):
+		frozen = _frozen(level, boxes, start, frozenset())
+		if frozen and not level.goals.issuperset(frozen):
+			return True
+	return False
+
+
+def _frozen(level, boxes, box, walls):
+	"""Return the boxes frozen together with box, None if box can still move"""
+	walls = walls | {box}
+	frozen = {box}
+	for step in (1, level.width):
+		if not _blocked(level, boxes, box, step, walls, frozen):
+			return None
+	return frozen
+
+
+def _blocked(level, boxes, box, step, walls, frozen):
+	"""Check if box is blocked along the axis of step, boxes in walls are treated as walls"""
+	sides = box - step, box + step
+	if any(level.walls[side] or side in walls for side in sides):
+		return True
+	if level.dead[sides[0]] and level.dead[sides[1]]:
+		return True
+	for side in sides:
+		if side in boxes:
+			cluster = _frozen(level, boxes, side, walls)
+			if cluster:
+				frozen |= cluster
+				return True
+	return False
+
+
+def matching_deadlock(level, state, box=None):
+	"""
+	There is no perfect assignment of boxes to goals they can still reach
+
+	Description:
+		Bipartite matching (augmenting paths) between the boxes and level.box_goals.
+	"""
+	match = {}
+
+	def augment(box, visited):
+		for goal in level.box_goals[box]:
+			if goal in visited:
+				continue
+			visited.add(goal)
+			if goal not in match or augment(match[goal], visited):
+				match[goal] = box
+				return True
+		return False
+
+	return not all(augment(box, set()) for box in state.boxes)
+
+
+def corral_deadlock(level, state, box=None):
+	"""
+	An empty goal is sealed off from the player by frozen boxes
+
+	Description:
+		A corral is an area the player can't reach. If every box on its border is frozen
+		the corral never changes again, so an empty goal inside can never be filled.
+		This is the sealed case of corral detection, PI-corral move pruning is not applied.
+	"""
+	width = level.width
+	steps = (width, -width, -1, 1)
+	boxes = frozenset(state.boxes)
+	seen = _fill(level, boxes, state.player)
+	for goal in level.goals.difference(boxes):
+		if goal in seen:
+			continue
+		corral = _fill(level, boxes, goal)
+		seen |= corral
+		border = {cell + step for cell in corral for step in steps if cell + step in boxes}
+		if border and all(_frozen(level, boxes, border_box, frozenset()) for border_box in border):
+			return True
+	return False
+
+
+def _fill(level, boxes, start):
+	"""Flood fill the floor cells connected to start without crossing walls or boxes"""
+	steps = (level.width, -level.width, -1, 1)
+	region = {start}
+	stack = [start]
+	while stack:
+		cell = stack.pop()
+		for step in steps:
+			new_cell = cell + step
+			if new_cell not in region and not level.walls[new_cell] and new_cell not in boxes:
+				region.add(new_cell)
+				stack.append(new_cell)
+	return region
+
+
+# every deadlock check, check(level, state, box=None) -> bool
+CHECKS = {
+	'dead_square': dead_square_deadlock,
+	'freeze': freeze_deadlock,
+	'matching': matching_deadlock,
+	'corral': corral_deadlock,
+}
+# checks used by the solvers, cheapest first
+DEFAULT_CHECKS = ('dead_square', 'freeze', 'matching')
+
+
+class DeadlockDetector:
+	"""
+	Run a configurable list of deadlock checks and count how often each one pays off
+
+	Parameters:
+		level (Level): The static level (walls and goals).
+		checks (iterable): Names of the checks in CHECKS, run in order. Defaults to DEFAULT_CHECKS.
+
+	Attributes:
+		calls (Counter): Number of states tested by each check.
+		hits (Counter): Number of deadlocks found by each check.
+	"""
+	def __init__(self, level, checks=DEFAULT_CHECKS):
+		self.level = level
+		try:
+			self.checks = [(name, CHECKS[name]) for name in checks]
+		except KeyError as e:
+			raise ValueError(f'Invalid deadlock check: {e}') from None
+		self.calls = Counter()
+		self.hits = Counter()
+
+	def __call__(self, state, box=None):
+		"""
+		Check if the state is a deadlock
+
+		Parameters:
+			state (State): The state of the game (player cell and box cells).
+			box (int): The cell of the box that just moved, None to test every box.
+
+		Returns:
+			bool: True if one of the checks found a deadlock, False otherwise.
+		"""
+		if not state:
+			return False
+		for name, check in self.checks:
+			self.calls[name] += 1
+			if check(self.level, state, box):
+				self.hits[name] += 1
+				return True
+		return False
+
+	def __str__(self):
+		return ', '.join(f'{name} {self.hits[name]}/{self.calls[name]}' for name, _ in self.checks)
@@ -6,4 +6,6 @@ NEXT_EVENT = pygame.USEREVENT + 3
 RANDOM_GAME_EVENT = pygame.USEREVENT + 4
 SOLVE_BFS_EVENT = pygame.USEREVENT + 5
 SOLVE_ASTARMAN_EVENT = pygame.USEREVENT + 6
-SOLVE_DIJKSTRA_EVENT = pygame.USEREVENT + 7
\ No newline at end of file
+SOLVE_DIJKSTRA_EVENT = pygame.USEREVENT + 7
+SOLVE_MATCHING_EVENT = pygame.USEREVENT + 8
+SOLVE_IDASTAR_EVENT = pygame.USEREVENT + 9
\ No newline at end of file
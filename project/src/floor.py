@@ -1,14 +1,12 @@
 import pygame
 
+from . import assets
+
 
 class Floor(pygame.sprite.Sprite):
     def __init__(self, *groups, x, y):
         super().__init__(*groups)
-        if x <= 15:
-            self.image = pygame.image.load('img/floor.png')
-        else:
-            self.image = pygame.image.load('img/sidefloor.png')
-        self.image = pygame.transform.scale(self.image, [64, 64])
+        self.image = assets.image('floor.png' if x <= 15 else 'sidefloor.png')
         self.rect = pygame.Rect(x * 64, y * 64, 64, 64)
         self.x = x
         self.y = y
@@ -23,6 +21,5 @@ class Floor(pygame.sprite.Sprite):
 class Goal(Floor):
     def __init__(self, *groups, x, y):
         super().__init__(*groups, x=x, y=y)
-        self.image = pygame.image.load('img/goal.png')
-        self.image = pygame.transform.scale(self.image, [64, 64])
+        self.image = assets.image('goal.png')
         self.rect = pygame.Rect(x * 64, y * 64, 64, 64)
\ No newline at end of file
@@ -1,9 +1,11 @@
 import random
+from collections import defaultdict
 
 import numpy as np
-import pygame
 
-from .game import ReverseGame
+from .bidirectional import solved_states
+from .level import Level
+from .utils import dijkstra_sum, pull_moves, rebuild_path
 
 MIN_W = 6
 MIN_H = 6
@@ -11,6 +13,11 @@ MAX_W = 15
 MAX_H = 10
 MIN_BOXES = 4
 MAX_BOXES = 10
+# walk directions as (row, col) steps, in the order ReversePlayer draws them
+PULLS = [(1, 0), (-1, 0), (0, -1), (0, 1)]
+# default number of boxes and state budget of the reverse search
+SEARCH_BOXES = 3
+REVERSE_STATES = 100000
 
 
 def num_boxes(puzzle_area):
@@ -21,27 +28,141 @@ def num_boxes(puzzle_area):
 def random_valid(width=10, height=10):
     return random.randrange(1, width - 1), random.randrange(1, height - 1)
 
-def visualize(reverse_game, puzzle_size):
-    pygame.event.pump()
-    reverse_game.player.update(puzzle_size)
-    reverse_game.floor_group.draw(reverse_game.window)
-    reverse_game.goal_group.draw(reverse_game.window)
-    reverse_game.object_group.draw(reverse_game.window)
-    pygame.display.update()
-    pygame.time.delay(1)
+def print_puzzle(matrix):
+    for row in matrix:
+        print(' '.join(row), ' ')
+    print('\n')
 
-def generate(window=None, seed=3, visualizer=False, path=None):
-    path = path or 'levels/lvl0.dat'
+
+class ReverseWalk:
+    """
+    Random walk of a player pulling boxes away from their goals, on a plain grid
+
+    Parameters:
+        puzzle (np.ndarray): The starting level: walls ('+'), the player ('*') and boxes on their goals ('$').
+
+    Attributes:
+        states (defaultdict): Number of steps taken from each grid of the walk.
+        curr_state (tuple): The grid before the last step.
+
+    Description:
+        The same rules and random draws as a ReversePlayer on a ReverseGame, without sprites.
+        The player steps in a random direction (the direction of its last blocked step, or
+        back where it came from, is 10 times less likely), turning walls into floor and
+        pulling the box behind it onto the cell it leaves. It never steps onto the border
+        or into a box. The floor only grows along a walk, so a grid is identified by
+        (player, boxes, floor size) instead of its whole text.
+    """
+    def __init__(self, puzzle):
+        self.height, self.width = puzzle.shape
+        chars = puzzle.flatten()
+        self.floor = {cell for cell, char in enumerate(chars) if char != '+'}
+        self.goals = frozenset(cell for cell, char in enumerate(chars) if char in '$X%')
+        self.boxes = {cell for cell, char in enumerate(chars) if char in '@$'}
+        self.player = next(cell for cell, char in enumerate(chars) if char in '*%')
+        self.prev_move = (0, 0)
+        self.states = defaultdict(int)
+        self.curr_state = None
+
+    def update(self):
+        """Take one step of the walk"""
+        move = random.choices(PULLS, weights=[0.1 if m == self.prev_move else 1 for m in PULLS], k=1)[0]
+        self.curr_state = (self.player, tuple(sorted(self.boxes)), len(self.floor))
+        self.states[self.curr_state] += 1
+        row, col = divmod(self.player, self.width)
+        row, col = row + move[0], col + move[1]
+        target = row * self.width + col
+        if (row == 0 or col == 0 or row >= self.height - 1 or col >= self.width - 1 or
+            target in self.boxes):
+            self.prev_move = move
+            return
+        self.prev_move = -move[0], -move[1]
+        behind = 2 * self.player - target
+        if behind in self.boxes:
+            self.boxes.remove(behind)
+            self.boxes.add(self.player)
+        self.floor.add(target)
+        self.player = target
+
+    def matrix(self):
+        """The level reached by the walk, 2D numpy array (height, width)"""
+        chars = []
+        for cell in range(self.height * self.width):
+            if cell not in self.floor:
+                chars.append('+')
+            elif cell == self.player:
+                chars.append('%' if cell in self.goals else '*')
+            elif cell in self.boxes:
+                chars.append('$' if cell in self.goals else '@')
+            else:
+                chars.append('X' if cell in self.goals else '-')
+        return np.array(chars, dtype='<U1').reshape(self.height, self.width)
+
+
+def visual_walk(window, seed, puzzle, counter):
+    """Walk on a ReverseGame and draw every step, returns the level reached"""
+    # the sprites are only needed to show the walk
+    import pygame
+
+    from .game import ReverseGame
+
+    height, width = puzzle_size = puzzle.shape
+    reverse_game = ReverseGame(window, level=0, seed=seed)
+    reverse_game.load_floor()
+    reverse_game.load_puzzle(puzzle)
+    player = reverse_game.player
+    while counter > 0:
+        pygame.event.pump()
+        reverse_game.player.update(puzzle_size)
+        reverse_game.floor_group.draw(reverse_game.window)
+        reverse_game.goal_group.draw(reverse_game.window)
+        reverse_game.object_group.draw(reverse_game.window)
+        pygame.display.update()
+        pygame.time.delay(1)
+        if player.states[player.curr_state] >= 20:
+            break
+        counter -= 1
+    slice_x = slice(reverse_game.pad_x, reverse_game.pad_x + width)
+    slice_y = slice(reverse_game.pad_y, reverse_game.pad_y + height)
+    matrix = np.array([[str(elem) for elem in row] for row in reverse_game.puzzle[slice_y, slice_x]], dtype='<U1')
+    player.kill()
+    del reverse_game
+    return matrix
+
+def walk(puzzle, counter):
+    """Walk for counter steps at most, or until a grid was left 20 times, returns the level reached"""
+    reverse_walk = ReverseWalk(puzzle)
+    while counter > 0:
+        reverse_walk.update()
+        if reverse_walk.states[reverse_walk.curr_state] >= 20:
+            break
+        counter -= 1
+    return reverse_walk.matrix()
+
+def random_level(seed=3, window=None, visualizer=False):
+    """
+    Generate a random level by walking a player backward from the solved boxes
+
+    Parameters:
+        seed (int): Seed of the random level, the same seed always gives the same level. Defaults to 3.
+        window (pygame.Surface): Where the walk is drawn when visualized. Defaults to None.
+        visualizer (bool): Whether the walk is drawn with the game sprites. Defaults to False.
+
+    Returns:
+        np.ndarray: The level, 2D numpy array (height, width).
+
+    Description:
+        Walks leaving fewer than half the boxes off their goals are dropped and the
+        generator draws another one from the same random sequence.
+    """
     random.seed(seed)
-    valid = False
-    while not valid:
+    while True:
         width = random.randint(MIN_W, MAX_W)
         height = random.randint(MIN_H, MAX_H)
         puzzle = np.full((height, width), '+', dtype='<U1')
         boxes = num_boxes(width * height)
         boxes_seen = set()
         player_pos = random_valid(width, height)
-        puzzle_size = height, width
         puzzle[player_pos[1], player_pos[0]] = '*'
         boxes_created = 0
         while boxes_created < boxes:
@@ -50,34 +171,117 @@ def generate(window=None, seed=3, visualizer=False, path=None):
                 puzzle[box_pos] = '$'
                 boxes_created += 1
                 boxes_seen.add(box_pos)
-        reverse_game = ReverseGame(window, level=0, seed=seed)
-        reverse_game.load_floor()
-        reverse_game.load_puzzle(puzzle)
-        player = reverse_game.player
         counter = round(height * width * random.uniform(1.8, 3.6))
-        while counter > 0:
-            if visualizer:
-                visualize(reverse_game, puzzle_size)
-            else:
-                reverse_game.player.update(puzzle_size)
-            if player.states[player.curr_state] >= 20:
-                break
-            counter -= 1
-        slice_x = slice(reverse_game.pad_x, reverse_game.pad_x + width)
-        slice_y = slice(reverse_game.pad_y, reverse_game.pad_y + height)
-        matrix = reverse_game.puzzle[slice_y, slice_x]
-        player.print_puzzle(matrix)
-        player.kill()
-        out_of_place_boxes = np.sum([str(x) == '@' for x in matrix.flatten()])
-        if out_of_place_boxes >= boxes // 2:
-            np.savetxt(path, matrix, fmt='%s')
-            valid = True
-            del reverse_game
+        # pygame draws the walk with the game sprites only when it is visualized
+        if visualizer:
+            matrix = visual_walk(window, seed, puzzle, counter)
         else:
-            seed += 1
-            del reverse_game
-            print(f'Not enough boxes out of place, generating new seed... [{out_of_place_boxes}]')
+            matrix = walk(puzzle, counter)
+        print_puzzle(matrix)
+        out_of_place_boxes = np.sum(matrix == '@')
+        if out_of_place_boxes >= boxes // 2:
+            return matrix
+        seed += 1
+        print(f'Not enough boxes out of place, generating new seed... [{out_of_place_boxes}]')
+
+def reverse_search(level, target=None, max_states=REVERSE_STATES, beam=None):
+    """
+    Breadth-first search over box pulls from the solved states, for a configuration far from the goals
+
+    Parameters:
+        level (Level): The room (walls and goals).
+        target (int): Stop this many pushes away from the goals, None to go as far as possible. Defaults to None.
+        max_states (int): Stop after the layer where this many states were reached. Defaults to REVERSE_STATES.
+        beam (int): States kept per layer (beam search), the ones with the largest push lower bound
+            (dijkstra_sum), None to keep every state. Defaults to None.
+
+    Returns:
+        tuple: (state, pushes, exact)
+            state (State): The configuration of the last layer with the most boxes off their goals.
+            pushes (list): The (box, move) pushes solving it, see rebuild_path.
+            exact (bool): True if no layer was cut by the beam, then len(pushes) is the optimal
+                number of pushes, otherwise it is an upper bound.
+
+    Description:
+        A state first reached at layer d of the pulls is d pushes away from the goals, so the
+        last layer holds the hardest configurations reached in pushes. The layers are never cut
+        without a beam, so the state budget only limits how far the search goes. With a beam the
+        search goes further for the same budget but a state may be closer than its layer.
+        The pulls back to the solved state are reversed into the pushes of the solution, as in
+        bidirectional.
+    """
+    layer = solved_states(level)
+    parents = dict.fromkeys(layer)
+    exact = True
+    depth = 0
+    while (target is None or depth < target) and len(parents) < max_states:
+        next_layer = []
+        children = {}
+        for state in layer:
+            for box, move, new_state in pull_moves(level, state):
+                if new_state not in parents and new_state not in children:
+                    children[new_state] = (state, box, move)
+        if not children:
+            break
+        next_layer = list(children)
+        if beam is not None and len(next_layer) > beam:
+            next_layer.sort(key=lambda state: -dijkstra_sum(level, state))
+            next_layer = next_layer[:beam]
+            exact = False
+        for state in next_layer:
+            parents[state] = children[state]
+        layer = next_layer
+        depth += 1
+
+    state = max(layer, key=lambda state: sum(box not in level.goals for box in state.boxes))
+    pushes = []
+    node = state
+    while parents[node] is not None:
+        node, box, move = parents[node]
+        step = level.offset(move)
+        pushes.append((box + step, (-move[0], -move[1])))
+    return state, pushes, exact
+
+def search_level(seed=3, boxes=SEARCH_BOXES, target=None, max_states=REVERSE_STATES, beam=None):
+    """
+    Generate a level of known difficulty: the room of random_level with the boxes placed by reverse_search
+
+    Parameters:
+        seed (int): Seed of the room, the same seed always gives the same level. Defaults to 3.
+        boxes (int): Number of boxes, a subset of the room's goals is kept. None keeps every goal,
+            the search then reaches fewer pushes for the same budget. Defaults to SEARCH_BOXES.
+        target (int): Pushes wanted, None for as many as possible. Defaults to None.
+        max_states (int): State budget of the reverse search. Defaults to REVERSE_STATES.
+        beam (int): Beam width of the reverse search, None for a complete search. Defaults to None.
+
+    Returns:
+        tuple: (matrix, solution, pushes, exact)
+            matrix (np.ndarray): The level, 2D numpy array (height, width).
+            solution (str): A solution path of the level.
+            pushes (int): The pushes of the solution, optimal if exact.
+            exact (bool): Whether every layer of the reverse search was complete.
+    """
+    room = random_level(seed)
+    goals = [(int(row), int(col)) for row, col in zip(*np.where(np.isin(room, ('X', '$', '%'))))]
+    if boxes is not None and boxes < len(goals):
+        goals = sorted(random.Random(seed).sample(goals, boxes))
+    matrix = np.where(room == '+', '+', '-')
+    for goal in goals:
+        matrix[goal] = 'X'
+
+    level = Level(matrix)
+    state, pushes, exact = reverse_search(level, target, max_states, beam)
+    for box in state.boxes:
+        matrix[level.position(box)] = '$' if box in level.goals else '@'
+    matrix[level.position(state.player)] = '%' if state.player in level.goals else '*'
+    return matrix, rebuild_path(level, state, pushes), len(pushes), exact
+
+def generate(window=None, seed=3, visualizer=False, path=None, search=False, boxes=SEARCH_BOXES, target=None):
+    path = path or 'levels/lvl0.dat'
+    # search: place the boxes as far as possible (or target pushes) from the goals with reverse_search
+    matrix = search_level(seed, boxes, target)[0] if search else random_level(seed, window, visualizer)
+    np.savetxt(path, matrix, fmt='%s')
 
 
 if __name__ == '__main__':
-    generate()
\ No newline at end of file
+    generate()
@@ -0,0 +1,253 @@
+import multiprocessing
+import os
+import time
+from functools import partial
+from heapq import heappop, heappush
+
+import numpy as np
+
+from .arena import MOVES, NodeArena
+from .deadlock import DEFAULT_CHECKS, DeadlockDetector
+from .heuristics import HEURISTICS, make_heuristic
+from .level import Level
+from .stats import SearchStats
+from .symmetry import LevelSymmetry
+from .utils import is_solved, normalize, push_moves, rebuild_path
+from .zobrist import TABLE_MEMORY, TranspositionTable, Zobrist
+
+# nodes expanded by each worker between two exchanges of children
+HDA_BATCH = 256
+
+
+def _worker(matrix, shard, workers, heuristic, memory, checks, symmetry, conn):
+	"""
+	Worker process of hdastar, owns the open and closed lists of the states whose key % workers == shard
+
+	Messages (kind, data) received on conn, each one is answered:
+		('root', (key, state, boxes_hash)): put the initial state in the open list, answered with None.
+		('round', (children, incumbent, batch)): insert the children routed to this worker, then
+			expand up to batch nodes with f < incumbent. Answered with
+			(children per owner shard, smallest f left in the open list, goals inserted as (g, ref)).
+		('node', index): answered with (parent ref, box, move index) of a node.
+		('stop', None): answered with the stats and deadlock counters, then the worker exits.
+
+	A child is (key, state, boxes_hash, g, h, parent ref, box, move). A ref is the global id
+	of a node: index * workers + shard.
+	"""
+	level = Level(matrix)
+	zobrist = Zobrist(level)
+	state_key = partial(LevelSymmetry(level).key, zobrist) if symmetry else zobrist.hash
+	estimate = make_heuristic(level, heuristic)
+	deadlocks = DeadlockDetector(level, checks)
+	stats = SearchStats()
+	seen = TranspositionTable(memory, replace='depth')
+	arena = NodeArena()
+	heap = []
+
+	while True:
+		kind, data = conn.recv()
+		if kind == 'root':
+			key, state, boxes_hash = data
+			h = estimate(state, None, None, None)
+			stats.evaluations += 1
+			seen.put(key, 0)
+			heappush(heap, (h, h, 0, 0, key, state, boxes_hash))
+			conn.send(None)
+		elif kind == 'round':
+			children, incumbent, batch = data
+			goals = []
+			# insert the children this worker owns, duplicate detection at the owner
+			for key, state, boxes_hash, g, h, parent, box, move in children:
+				best = seen.get(key)
+				if best is not None and best <= g:
+					stats.duplicates += 1
+					continue
+				stats.reopened += best is not None
+				seen.put(key, g)
+				index = arena.add(parent, box, move)
+				if is_solved(level, state):
+					goals.append((g, index * workers + shard))
+				else:
+					heappush(heap, (g + h, h, index, g, key, state, boxes_hash))
+
+			# expand the best nodes of the open list, skipping stale entries
+			routed = [[] for _ in range(workers)]
+			expanded = 0
+			while heap and expanded < batch and heap[0][0] < incumbent:
+				_, _, index, g, key, state, boxes_hash = heappop(heap)
+				best = seen.get(key)
+				if best is not None and best < g:
+					continue
+				expanded += 1
+				stats.expanded += 1
+				ref = index * workers + shard
+				for box, move, new_state, _ in push_moves(level, state):
+					stats.generated += 1
+					step = level.offset(move)
+					if deadlocks(new_state, box + step):
+						continue
+					h = estimate(new_state, state, box, box + step)
+					stats.evaluations += 1
+					if h == float('inf'):
+						continue
+					new_hash = zobrist.push(boxes_hash, box, step)
+					new_key = state_key(new_state, new_hash)
+					routed[new_key % workers].append((new_key, new_state, new_hash, g + 1, h, ref, box, move))
+			conn.send((routed, heap[0][0] if heap else float('inf'), goals))
+		elif kind == 'node':
+			conn.send((arena.parents[data], arena.boxes[data], arena.moves[data]))
+		else:
+			conn.send((stats.as_dict(), dict(deadlocks.calls), dict(deadlocks.hits)))
+			return
+
+
+def hdastar(matrix, player_pos, heuristic='manhattan', workers=None, memory=TABLE_MEMORY,
+			checks=DEFAULT_CHECKS, batch=HDA_BATCH, stats=None, progress=None, symmetry=False):
+	"""
+	Use hash-distributed A* (HDA*) on several processes to find the optimal path to solve sokoban puzzle
+
+	Parameters:
+		matrix (numpy.ndarray): sokoban puzzle matrix, 2D numpy array (height, width)
+		player_pos (tuple): player position in the matrix (x, y)
+		heuristic (str, optional): heuristic to use, 'manhattan', 'dijkstra' or 'matching'. Defaults to 'manhattan'.
+		workers (int, optional): number of worker processes. Defaults to os.cpu_count().
+		memory (int, optional): memory budget of all the closed list shards in bytes. Defaults to TABLE_MEMORY.
+		checks (iterable, optional): names of the deadlock checks to run. Defaults to DEFAULT_CHECKS.
+		batch (int, optional): nodes expanded by each worker between two exchanges. Defaults to HDA_BATCH.
+		stats (SearchStats, optional): counters to fill with the sum of the workers' counters. Defaults to None.
+		progress (Progress, optional): observer notified of the f bound of the open lists after the rounds
+			(due() counts rounds, not expansions) and of the result. Defaults to None.
+		symmetry (bool, optional): states mirrored by a symmetry of the level share their key, so
+			they have one owner and one closed list entry. Defaults to False.
+
+	Returns:
+		tuple: solution path as a string and depth
+
+	Description:
+		Every state is owned by the worker key % workers, which keeps its open list entry and
+		its best g-value. The workers expand batches of nodes and the generated children are
+		exchanged in one message per worker and round. A solved state inserted by its owner
+		is an upper bound (incumbent) of the pushes; the search stops once no open node and
+		no child in flight has f = g + h below the incumbent, so with an admissible heuristic
+		the incumbent is optimal. Nodes live in the arena of their owner, the parent of a
+		node is a global ref (index * workers + shard).
+	"""
+
+	if workers is None:
+		workers = os.cpu_count() or 1
+	if workers < 1:
+		raise ValueError(f'Invalid number of workers: {workers}')
+	print(f'HDA* - {heuristic.title()} Heuristic - {workers} workers')
+	heur = '[HDA*]'
+	if heuristic not in HEURISTICS:
+		raise ValueError(f'Invalid heuristic: {heuristic}')
+	stats = stats if stats is not None else SearchStats()
+
+	# static level and initial state (player cell and box cells)
+	level = Level(matrix)
+	initial_state = level.initial._replace(player=level.cell(player_pos))
+	zobrist = Zobrist(level)
+	state_key = partial(LevelSymmetry(level).key, zobrist) if symmetry else zobrist.hash
+	start_state = normalize(level, initial_state)
+	start_hash = zobrist.boxes_hash(start_state.boxes)
+	start_key = state_key(start_state, start_hash)
+	if is_solved(level, start_state):
+		print(f'{heur} Solution found!\n\n\nDepth 0\nPushes 0\n')
+		if progress is not None:
+			progress.finish(heur, '', 0, stats)
+		return ('', 0)
+
+	# one pipe per worker, each worker owns a shard of the open and closed lists
+	connections, processes = [], []
+	for shard in range(workers):
+		conn, child_conn = multiprocessing.Pipe()
+		process = multiprocessing.Process(
+			target=_worker, daemon=True,
+			args=(matrix, shard, workers, heuristic, memory // workers, checks, symmetry, child_conn),
+		)
+		process.start()
+		connections.append(conn)
+		processes.append(process)
+
+	incumbent, goal = float('inf'), None
+	calls, hits = {}, {}
+	try:
+		connections[start_key % workers].send(('root', (start_key, start_state, start_hash)))
+		connections[start_key % workers].recv()
+		inbox = [[] for _ in range(workers)]
+
+		while True:
+			for conn, children in zip(connections, inbox):
+				conn.send(('round', (children, incumbent, batch)))
+			inbox = [[] for _ in range(workers)]
+			open_f = float('inf')
+			for conn in connections:
+				routed, min_f, goals = conn.recv()
+				open_f = min(open_f, min_f)
+				for g, ref in goals:
+					if g < incumbent:
+						incumbent, goal = g, ref
+				for shard, children in enumerate(routed):
+					inbox[shard].extend(children)
+
+			# children that can't beat the incumbent are dropped, stop when nothing can
+			inbox = [[child for child in children if child[3] + child[4] < incumbent] for children in inbox]
+			if open_f >= incumbent and not any(inbox):
+				break
+			if progress is not None and progress.due():
+				progress.report(heur, min(open_f, incumbent), '', stats)
+
+		# rebuild the pushes by following the global parent refs across the workers
+		pushes = []
+		ref = goal
+		while ref is not None and ref >= 0:
+			connections[ref % workers].send(('node', ref // workers))
+			parent, box, move = connections[ref % workers].recv()
+			if parent >= 0:
+				pushes.append((box, move))
+			ref = parent
+
+		# collect the stats and deadlock counters of every worker
+		for conn in connections:
+			conn.send(('stop', None))
+			worker_stats, worker_calls, worker_hits = conn.recv()
+			stats.merge(worker_stats)
+			for name in worker_calls:
+				calls[name] = calls.get(name, 0) + worker_calls[name]
+				hits[name] = hits.get(name, 0) + worker_hits.get(name, 0)
+	finally:
+		for process in processes:
+			process.join(timeout=1)
+			if process.is_alive():
+				process.terminate()
+
+	stats.deadlocks = {name: hits.get(name, 0) for name in calls}
+	deadlocks = ', '.join(f'{name} {hits.get(name, 0)}/{calls[name]}' for name in calls)
+	if goal is not None:
+		path = rebuild_path(level, initial_state, [(box, MOVES[move]) for box, move in reversed(pushes)])
+		print(f'{heur} Solution found!\n\n{path}\nDepth {len(path)}\nPushes {incumbent}\n'
+			  f'Nodes: {stats}\nDeadlocks: {deadlocks}\n')
+		if progress is not None:
+			progress.finish(heur, path, len(path), stats)
+		return (path, len(path))
+
+	# solution not found
+	print(f'{heur} Solution not found!\nNodes: {stats}\nDeadlocks: {deadlocks}\n')
+	if progress is not None:
+		progress.finish(heur, None, -1, stats)
+	return (None, -1)
+
+# Read the sokoban puzzle matrix and player position
+def solve_hdastar(puzzle, heuristic='manhattan', workers=None, memory=TABLE_MEMORY,
+				  checks=DEFAULT_CHECKS, batch=HDA_BATCH, stats=None, progress=None, symmetry=False):
+	matrix = puzzle
+	where = np.where((matrix == '*') | (matrix == '%'))
+	player_pos = where[0][0], where[1][0]
+	return hdastar(matrix, player_pos, heuristic, workers, memory, checks, batch, stats, progress, symmetry)
+
+if __name__ == '__main__':
+	start = time.time()
+	solve_hdastar(np.loadtxt('levels/lvl5.dat', dtype='<U1'), heuristic='dijkstra')
+
+	# Calculate the runtime
+	print(f'Runtime: {time.time() - start} seconds')
@@ -0,0 +1,27 @@
+from .matching import MatchingHeuristic
+from .utils import dijkstra_sum, manhattan_sum
+
+# heuristics of the A* family of solvers
+HEURISTICS = ('manhattan', 'dijkstra', 'matching')
+
+
+def make_heuristic(level, heuristic):
+	"""
+	Build the heuristic function of a level
+
+	Parameters:
+		level (Level): The static level (walls, goals and push distances).
+		heuristic (str): 'manhattan', 'dijkstra' or 'matching'.
+
+	Returns:
+		callable: estimate(state, parent, box, new_box), a lower bound of the pushes left.
+			parent, box and new_box describe the push that reached state (None for the root),
+			the matching heuristic uses them to update the parent's matching.
+	"""
+	if heuristic == 'manhattan':
+		return lambda state, parent, box, new_box: manhattan_sum(level, state)
+	if heuristic == 'dijkstra':
+		return lambda state, parent, box, new_box: dijkstra_sum(level, state)
+	if heuristic == 'matching':
+		return MatchingHeuristic(level)
+	raise ValueError(f'Invalid heuristic: {heuristic}')
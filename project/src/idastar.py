@@ -0,0 +1,174 @@
+import time
+
+import numpy as np
+
+from .cache import cached
+from .deadlock import DEFAULT_CHECKS, DeadlockDetector
+from .heuristics import make_heuristic
+from .level import Level
+from .stats import SearchStats
+from .utils import is_solved, normalize, push_moves, rebuild_path
+from .zobrist import TranspositionTable, Zobrist
+
+# default memory budget of the IDA* transposition table (bytes)
+IDA_MEMORY = 4 * 2**20
+
+
+def idastar(matrix, player_pos, progress=None, heuristic='manhattan',
+			memory=IDA_MEMORY, checks=DEFAULT_CHECKS, stats=None):
+	"""
+	Use iterative deepening A* (IDA*) to find the optimal path to solve sokoban puzzle
+
+	Parameters:
+		matrix (numpy.ndarray): sokoban puzzle matrix, 2D numpy array (height, width)
+		player_pos (tuple): player position in the matrix (x, y)
+		progress (Progress, optional): observer notified of the pushes so far and of the result. Defaults to None.
+		heuristic (str, optional): heuristic to use, 'manhattan', 'dijkstra' or 'matching'. Defaults to 'manhattan'.
+		memory (int, optional): memory budget of the transposition table in bytes. Defaults to IDA_MEMORY.
+		checks (iterable, optional): names of the deadlock checks to run. Defaults to DEFAULT_CHECKS.
+		stats (SearchStats, optional): counters to fill during the search. Defaults to None.
+
+	Returns:
+		tuple: solution path as a string and depth
+
+	Description:
+		Depth-first search over pushes, cut off when f = g + h exceeds a bound. The bound
+		starts at h of the initial state and is raised to the smallest f that was cut off,
+		until a solution is found. Only the current path and the children of its states are
+		kept, plus a fixed-size table of the g-value every state was reached with in the
+		current iteration: a state reached again at a worse or equal g is pruned, which
+		also cuts cycles. Memory stays bounded however long the search runs.
+	"""
+
+	# print the heuristic
+	print(f'IDA* - {heuristic.title()} Heuristic')
+	heur = '[IDA*]'
+	stats = stats if stats is not None else SearchStats()
+
+	# static level and initial state (player cell and box cells)
+	level = Level(matrix)
+	initial_state = level.initial._replace(player=level.cell(player_pos))
+	estimate = make_heuristic(level, heuristic)
+
+	# deadlock checks, counting the hits of each check
+	deadlocks = DeadlockDetector(level, checks)
+
+	# push generation, deadlock checks and heuristic, timed if stats.timing
+	moves = stats.timed('push_moves', push_moves, iterate=True)
+	is_deadlock = stats.timed('is_deadlock', deadlocks)
+	estimate = stats.timed('heuristic', estimate)
+	zobrist = Zobrist(level)
+	direction = {
+		(1, 0): 'D',
+		(-1, 0): 'U',
+		(0, -1): 'L',
+		(0, 1): 'R',
+	}
+
+	def expand(state, boxes_hash, g, seen):
+		"""Children of a state as (f, h, box, move, state, boxes hash), smallest f first"""
+		children = []
+		for box, move, new_state, _ in moves(level, state):
+			stats.generated += 1
+			step = level.offset(move)
+			new_hash = zobrist.push(boxes_hash, box, step)
+			key = zobrist.hash(new_state, new_hash)
+			# drop states already reached in this iteration with a better or equal g-value
+			best = seen.get(key)
+			if best is not None and best <= g + 1:
+				stats.duplicates += 1
+				continue
+			if is_deadlock(new_state, box + step):
+				continue
+			h = estimate(new_state, state, box, box + step)
+			stats.evaluations += 1
+			if h == float('inf'):
+				continue
+			seen.put(key, g + 1)
+			children.append((g + 1 + h, h, box, move, new_state, new_hash))
+		children.sort(key=lambda child: child[:2])
+		return children
+
+	start_state = normalize(level, initial_state)
+	start_hash = zobrist.boxes_hash(start_state.boxes)
+	bound = estimate(start_state, None, None, None)
+	stats.evaluations += 1
+	depth = 0
+
+	# one table for every iteration, cleared when the bound goes up
+	seen = TranspositionTable(memory, replace='depth')
+	while bound < float('inf'):
+		print(f'{heur} Bound {bound}')
+		seen.clear()
+		seen.put(zobrist.hash(start_state, start_hash), 0)
+		next_bound = float('inf')
+
+		# the path is the list of pushes, the stack holds the children left to try at each depth
+		pushes = []
+		stats.expanded += 1
+		solved = is_solved(level, start_state)
+		stack = [] if solved else [iter(expand(start_state, start_hash, 0, seen))]
+
+		while stack:
+			child = next(stack[-1], None)
+			# children are sorted by f: once one is over the bound all the others are too
+			if child is not None and child[0] > bound:
+				next_bound = min(next_bound, child[0])
+				child = None
+			if child is None:
+				stack.pop()
+				if pushes:
+					pushes.pop()
+				continue
+
+			_, _, box, move, state, boxes_hash = child
+			pushes.append((box, move))
+			stats.expanded += 1
+			# the frontier of the depth-first search is the stack
+			if stats.timeline and stats.expanded % stats.timeline == 0:
+				stats.sample(len(stack))
+			if is_solved(level, state):
+				solved = True
+				break
+			stack.append(iter(expand(state, boxes_hash, len(pushes), seen)))
+
+			# notify the observer with the pushes so far
+			if progress is not None and progress.due():
+				path = ''.join(direction[push] for _, push in pushes)
+				progress.report(heur, len(pushes), path, stats)
+
+		# check if the solution is found, rebuild the walking path between pushes
+		if solved:
+			path = rebuild_path(level, initial_state, pushes)
+			stats.deadlocks = dict(deadlocks.hits)
+			print(f'{heur} Solution found!\n\n{path}\nDepth {len(path)}\nPushes {len(pushes)}\n'
+				  f'Nodes: {stats}\nDeadlocks: {deadlocks}\n')
+			if progress is not None:
+				progress.finish(heur, path, len(path), stats)
+			return (path, len(path))
+		depth, bound = bound, next_bound
+
+	# solution not found, every state is a deadlock or was cut off for good
+	stats.deadlocks = dict(deadlocks.hits)
+	print(f'{heur} Solution not found!\nNodes: {stats}\nDeadlocks: {deadlocks}\n')
+	if progress is not None:
+		progress.finish(heur, None, depth, stats)
+	return (None, -1)
+
+# Read the sokoban puzzle matrix and player position, the solution cache is consulted first
+# (cache=False bypasses it)
+def solve_idastar(puzzle, progress=None, heuristic='manhattan', memory=IDA_MEMORY,
+				  checks=DEFAULT_CHECKS, stats=None, cache=None):
+	def solve():
+		matrix = puzzle
+		where = np.where((matrix == '*') | (matrix == '%'))
+		player_pos = where[0][0], where[1][0]
+		return idastar(matrix, player_pos, progress, heuristic, memory, checks, stats)
+	return cached(cache, puzzle, f'idastar-{heuristic}', solve, stats, progress)
+
+if __name__ == '__main__':
+	start = time.time()
+	solve_idastar(np.loadtxt('levels/lvl5.dat', dtype='<U1'), heuristic='dijkstra')
+
+	# Calculate the runtime
+	print(f'Runtime: {time.time() - start} seconds')
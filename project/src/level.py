@@ -0,0 +1,64 @@
+from collections import namedtuple
+
+from .deadlock import box_goals, dead_squares, push_distances
+
+# A search node: the player cell and the sorted tuple of box cells.
+# Cells are 1D indexes into the level grid (row * width + col).
+State = namedtuple('State', ['player', 'boxes'])
+
+
+class Level:
+	"""
+	Static part of a Sokoban puzzle (walls and goals), shared by every search node
+
+	Parameters:
+		matrix (np.ndarray): The Sokoban puzzle, 2D numpy array. (height, width)
+
+	Attributes:
+		shape (tuple): The shape of the matrix. (height, width)
+		walls (bytearray): 1 for every wall cell, 0 otherwise. Border cells are walls.
+		goals (frozenset): The goal cells.
+		initial (State): The initial state of the puzzle.
+		distances (dict): goal -> push distance of a box on every cell to that goal.
+		nearest (list): For every cell, the push distance of a box on that cell to the nearest goal.
+		box_goals (list): For every cell, the goals a box on that cell can be pushed to.
+		dead (bytearray): 1 for every cell from which a box can never reach a goal.
+	"""
+	def __init__(self, matrix):
+		self.shape = matrix.shape
+		self.height, self.width = height, width = self.shape
+		walls, goals, boxes = bytearray(height * width), [], []
+		player = None
+
+		# wall: +, box: @, player: *, goal: X, box on goal: $, player on goal: %, empty: -
+		for cell, char in enumerate(matrix.flatten()):
+			x, y = divmod(cell, width)
+			# the border is treated as a wall so moves never leave the grid
+			if char == '+' or x in (0, height - 1) or y in (0, width - 1):
+				walls[cell] = 1
+			if char in 'X$%':
+				goals.append(cell)
+			if char in '@$':
+				boxes.append(cell)
+			elif char in '*%':
+				player = cell
+
+		self.walls = walls
+		self.goals = frozenset(goals)
+		self.initial = State(player, tuple(sorted(boxes)))
+		self.distances = push_distances(self)
+		self.nearest = [min(distances) for distances in zip(*self.distances.values())]
+		self.box_goals = box_goals(self)
+		self.dead = dead_squares(self)
+
+	def cell(self, pos):
+		"""Convert a 2D position (x, y) to a 1D cell"""
+		return pos[0] * self.width + pos[1]
+
+	def position(self, cell):
+		"""Convert a 1D cell to a 2D position (x, y)"""
+		return divmod(cell, self.width)
+
+	def offset(self, move):
+		"""Convert a move direction (x, y) to a 1D cell offset"""
+		return move[0] * self.width + move[1]
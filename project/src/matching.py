@@ -0,0 +1,140 @@
+# cost of a box-goal pair the box can never reach, bigger than any real matching cost
+UNREACHABLE = 10**6
+# above this number of boxes the heuristic falls back to the greedy lower bound
+MATCHING_LIMIT = 12
+
+
+def greedy_bound(costs):
+	"""
+	Lower bound of the minimum-cost perfect matching without solving it
+
+	Parameters:
+		costs (list): Square cost matrix, costs[box][goal].
+
+	Returns:
+		int: The biggest of the sum of the row minima and the sum of the column minima.
+	"""
+	rows = sum(min(row) for row in costs)
+	cols = sum(min(col) for col in zip(*costs))
+	return max(rows, cols)
+
+
+def _augment(costs, u, v, p, row):
+	"""
+	Add a row to a partial matching (Hungarian algorithm, one phase, O(n^2))
+
+	Parameters:
+		costs (list): Square cost matrix, 0-indexed.
+		u (list): Row potentials, 1-indexed.
+		v (list): Column potentials, 1-indexed, v[0] is unused.
+		p (list): p[col] is the row matched to col (1-indexed), 0 if none.
+		row (int): The row to add (1-indexed).
+	"""
+	n = len(costs)
+	minv = [float('inf')] * (n + 1)
+	used = [False] * (n + 1)
+	way = [0] * (n + 1)
+	p[0] = row
+	col = 0
+	while p[col]:
+		used[col] = True
+		curr_row, delta, next_col = p[col], float('inf'), 0
+		for j in range(1, n + 1):
+			if not used[j]:
+				cur = costs[curr_row - 1][j - 1] - u[curr_row] - v[j]
+				if cur < minv[j]:
+					minv[j], way[j] = cur, col
+				if minv[j] < delta:
+					delta, next_col = minv[j], j
+		for j in range(n + 1):
+			if used[j]:
+				u[p[j]] += delta
+				v[j] -= delta
+			else:
+				minv[j] -= delta
+		col = next_col
+	# flip the augmenting path
+	while col:
+		prev = way[col]
+		p[col] = p[prev]
+		col = prev
+
+
+class MatchingHeuristic:
+	"""
+	Minimum-cost perfect matching between boxes and goals over the push distances
+
+	Parameters:
+		level (Level): The static level (walls, goals and push distances).
+		limit (int): Maximum number of boxes solved exactly, greedy_bound is used above. Defaults to MATCHING_LIMIT.
+
+	Description:
+		Unlike manhattan_sum and dijkstra_sum, two boxes can't claim the same goal.
+		The matching (potentials u, v and assignment p) of the last expanded state is kept:
+		a child that only moved one box re-solves that single row in O(n^2) instead of
+		running the full O(n^3) Hungarian algorithm.
+	"""
+	def __init__(self, level, limit=MATCHING_LIMIT):
+		self.level = level
+		self.limit = limit
+		self.goals = sorted(level.goals)
+		# parent state and its (rows, u, v, p)
+		self.parent = None
+		self.solution = None
+
+	def costs(self, boxes):
+		"""Cost matrix of the boxes (rows) to every goal (columns)"""
+		distances = self.level.distances
+		return [
+			[min(distances[goal][box], UNREACHABLE) for goal in self.goals]
+			for box in boxes
+		]
+
+	def solve(self, boxes):
+		"""Solve the full matching for boxes, returns (rows, u, v, p)"""
+		rows = list(boxes)
+		costs = self.costs(rows)
+		n = len(rows)
+		u, v, p = [0] * (n + 1), [0] * (n + 1), [0] * (n + 1)
+		for row in range(1, n + 1):
+			_augment(costs, u, v, p, row)
+		return rows, u, v, p
+
+	def cost(self, rows, p):
+		"""Total cost of a matching, inf if a box is matched to a goal it can't reach"""
+		distances = self.level.distances
+		return sum(distances[self.goals[col - 1]][rows[p[col] - 1]] for col in range(1, len(p)))
+
+	def __call__(self, state, parent=None, box=None, new_box=None):
+		"""
+		Calculate the matching cost of a state
+
+		Parameters:
+			state (State): The state of the game (player cell and box cells).
+			parent (State): The state it was reached from. Defaults to None.
+			box (int): The cell of the pushed box in parent. Defaults to None.
+			new_box (int): The cell of the pushed box in state. Defaults to None.
+
+		Returns:
+			int: The heuristic cost of moving the boxes to the goals, a lower bound of the pushes left.
+		"""
+		if len(state.boxes) > self.limit:
+			return greedy_bound(self.costs(state.boxes))
+
+		if parent is None:
+			rows, _, _, p = self.solve(state.boxes)
+			return self.cost(rows, p)
+
+		# the matching of the parent is solved once and reused by all of its children
+		if parent != self.parent:
+			self.parent, self.solution = parent, self.solve(parent.boxes)
+		rows, u, v, p = (list(values) for values in self.solution)
+
+		# replace the row of the moved box, keep the potentials feasible and re-augment it
+		row = rows.index(box) + 1
+		rows[row - 1] = new_box
+		costs = self.costs(rows)
+		p[p.index(row, 1)] = 0
+		u[row] = min(costs[row - 1][j - 1] - v[j] for j in range(1, len(v)))
+		_augment(costs, u, v, p, row)
+		return self.cost(rows, p)
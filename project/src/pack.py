@@ -0,0 +1,221 @@
+"""
+Bulk generation of level packs
+
+Usage:
+	python -m src.pack 1 1000 -o packs/pack.json --algorithm astar --heuristic matching --budget 50000 --min-difficulty 40
+	python -m src.pack 1 100 --search --boxes 3
+
+Every seed of the range is generated and solved on a pool of worker processes. A level is
+kept if the solver proves it solvable within the budget and its difficulty is in range.
+With --search the boxes are placed by a reverse search (generator.search_level), every
+level is solvable and its optimal number of pushes is known before it is solved.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+
+import numpy as np
+
+from .cache import canonical_level, level_key
+from .deadlock import CHECKS, DEFAULT_CHECKS
+from .generator import SEARCH_BOXES, random_level, search_level
+from .heuristics import HEURISTICS
+from .progress import Progress
+from .solve import ALGORITHMS, MODES, solve_puzzle
+from .stats import SearchStats
+from .symmetry import canonical_symmetry
+
+# default budget of nodes expanded to prove a level solvable
+PACK_BUDGET = 100000
+
+
+class BudgetExceeded(Exception):
+	"""The solver expanded more nodes than its budget"""
+
+
+def difficulty(moves, expanded):
+	"""
+	Difficulty score of a solved level
+
+	Parameters:
+		moves (int): Length of the solution.
+		expanded (int): Nodes expanded by the solver.
+
+	Returns:
+		float: The solution length weighted by the search effort, moves * log10(expanded + 10),
+			so a level solved without search scores its solution length.
+	"""
+	return round(moves * math.log10(expanded + 10), 2)
+
+
+def check_level(seed, solver, budget=PACK_BUDGET, search=None):
+	"""
+	Generate the level of a seed and solve it within a budget
+
+	Parameters:
+		seed (int): The seed of generator.random_level.
+		solver (dict): Keyword arguments of solve.solve_puzzle (algorithm, heuristic, mode, checks).
+		budget (int): Nodes the solver may expand, None for no limit. Defaults to PACK_BUDGET.
+		search (dict): Keyword arguments of generator.search_level (boxes, target...) to generate
+			with the reverse search, None for generator.random_level. Defaults to None.
+
+	Returns:
+		dict: The seed, the level rows (as in a .dat file), the status ('solved', 'unsolvable'
+			or 'budget') and for a solved level its solution, moves, expanded and generated
+			nodes and difficulty. A level of the reverse search also has its pushes and
+			whether they are optimal (exact).
+
+	Description:
+		The budget counts nodes instead of seconds, so the result only depends on the seed
+		and the solver, whatever the machine and its load.
+	"""
+	def stop(report):
+		if report.status == 'searching':
+			raise BudgetExceeded
+
+	with contextlib.redirect_stdout(io.StringIO()):
+		if search is None:
+			matrix, known = random_level(seed), {}
+		else:
+			matrix, _, pushes, exact = search_level(seed, **search)
+			known = {'pushes': pushes, 'exact': exact}
+		stats = SearchStats()
+		progress = Progress(stop, every=budget, interval=None) if budget else None
+		try:
+			solution, _ = solve_puzzle(matrix, stats=stats, progress=progress, **solver)
+		except BudgetExceeded:
+			solution, status = None, 'budget'
+		else:
+			status = 'solved' if solution is not None else 'unsolvable'
+
+	entry = {'seed': seed, 'rows': [' '.join(row) for row in matrix], 'status': status, **known}
+	if solution is not None:
+		entry.update({
+			'solution': solution,
+			'moves': len(solution),
+			'expanded': stats.expanded,
+			'generated': stats.generated,
+			'difficulty': difficulty(len(solution), stats.expanded),
+		})
+	return entry
+
+
+def _check(task):
+	return check_level(*task)
+
+
+def generate_pack(seeds, solver=None, budget=PACK_BUDGET, min_difficulty=0, max_difficulty=None, workers=None, verbose=True, search=None):
+	"""
+	Generate the levels of a seed range, keep the solvable ones in the difficulty range
+
+	Parameters:
+		seeds (iterable): The seeds.
+		solver (dict): Keyword arguments of solve.solve_puzzle. Defaults to A* with the matching heuristic.
+		budget (int): Nodes the solver may expand per level, None for no limit. Defaults to PACK_BUDGET.
+		min_difficulty (float): Smallest difficulty kept. Defaults to 0.
+		max_difficulty (float): Largest difficulty kept, None for no limit. Defaults to None.
+		workers (int): Number of worker processes. Defaults to os.cpu_count().
+		verbose (bool): Print a line per seed. Defaults to True.
+		search (dict): Keyword arguments of generator.search_level, None to generate with
+			generator.random_level. Defaults to None.
+
+	Returns:
+		dict: The pack: its settings and the accepted levels in seed order (see check_level).
+
+	Description:
+		Seeds are handed to the workers one at a time so a slow level does not hold back
+		a batch. The levels come back in seed order and a level generated again by a later
+		seed (same canonical form up to rotations and mirrors) is dropped, so the pack of
+		a seed range is always the same.
+	"""
+	solver = dict(solver or {'algorithm': 'astar', 'heuristic': 'matching'})
+	seeds = list(seeds)
+	workers = workers or os.cpu_count() or 1
+	levels, keys = [], set()
+	with multiprocessing.Pool(workers) as pool:
+		for entry in pool.imap(_check, [(seed, solver, budget, search) for seed in seeds], chunksize=1):
+			status = entry['status']
+			if status == 'solved':
+				rows, player, _ = canonical_level(np.array([row.split() for row in entry['rows']]))
+				key = level_key(*canonical_symmetry(rows, player)[:2])
+				if key in keys:
+					status = 'duplicate'
+				elif entry['difficulty'] < min_difficulty or (max_difficulty is not None and entry['difficulty'] > max_difficulty):
+					status = 'rejected'
+				else:
+					status = 'accepted'
+					keys.add(key)
+					levels.append(entry)
+			if verbose:
+				print(f'seed {entry["seed"]:<8} {status:<10} moves {entry.get("moves")} '
+					  f'expanded {entry.get("expanded")} difficulty {entry.get("difficulty")}', flush=True)
+	return {
+		'seeds': seeds,
+		'solver': solver,
+		'budget': budget,
+		'search': search,
+		'min_difficulty': min_difficulty,
+		'max_difficulty': max_difficulty,
+		'levels': levels,
+	}
+
+
+def save_pack(pack, path):
+	directory = os.path.dirname(path)
+	if directory:
+		os.makedirs(directory, exist_ok=True)
+	with open(path, 'w') as f:
+		json.dump(pack, f, indent=1)
+
+
+def load_pack(path):
+	"""
+	Read a pack file
+
+	Returns:
+		list: (matrix, entry) for every level, matrix is the 2D numpy array of the level as
+			loaded from a .dat file and entry its metadata (seed, solution, difficulty...).
+	"""
+	with open(path) as f:
+		pack = json.load(f)
+	return [(np.array([row.split() for row in entry['rows']], dtype='<U1'), entry) for entry in pack['levels']]
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog='python -m src.pack', description=__doc__.strip().split('\n')[0])
+	parser.add_argument('start', type=int, help='first seed')
+	parser.add_argument('stop', type=int, help='last seed (included)')
+	parser.add_argument('-o', '--output', default='levels/pack.json', help='the pack file')
+	parser.add_argument('-a', '--algorithm', choices=ALGORITHMS, default='astar')
+	parser.add_argument('--heuristic', choices=HEURISTICS, default='matching', help='heuristic of astar and idastar')
+	parser.add_argument('--mode', choices=MODES, default='astar', help='search mode of astar')
+	parser.add_argument('--checks', default=','.join(DEFAULT_CHECKS), help=f'deadlock checks among {", ".join(CHECKS)}')
+	parser.add_argument('-b', '--budget', type=int, default=PACK_BUDGET, help='nodes expanded per level, 0 for no limit')
+	parser.add_argument('--min-difficulty', type=float, default=0)
+	parser.add_argument('--max-difficulty', type=float, default=None)
+	parser.add_argument('--search', action='store_true', help='place the boxes with the reverse search')
+	parser.add_argument('--boxes', type=int, default=SEARCH_BOXES, help='boxes of a level of the reverse search, 0 for every goal of the room')
+	parser.add_argument('--target', type=int, default=None, help='pushes of a level of the reverse search (default: as many as possible)')
+	parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+	args = parser.parse_args(argv)
+
+	checks = tuple(name for name in args.checks.split(',') if name)
+	for name in checks:
+		if name not in CHECKS:
+			parser.error(f'invalid deadlock check: {name}')
+	solver = {'algorithm': args.algorithm, 'heuristic': args.heuristic, 'mode': args.mode, 'checks': checks}
+	search = {'boxes': args.boxes or None, 'target': args.target} if args.search else None
+	pack = generate_pack(
+		range(args.start, args.stop + 1), solver, args.budget or None,
+		args.min_difficulty, args.max_difficulty, args.workers, search=search,
+	)
+	save_pack(pack, args.output)
+	print(f'{len(pack["levels"])} levels saved to {args.output}')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,240 @@
+import multiprocessing
+import os
+import time
+from functools import partial
+from operator import itemgetter
+
+import numpy as np
+
+from .arena import MOVES, NodeArena
+from .deadlock import DEFAULT_CHECKS, DeadlockDetector
+from .level import Level
+from .stats import SearchStats
+from .symmetry import LevelSymmetry
+from .utils import is_solved, normalize, push_moves, rebuild_path
+from .zobrist import TABLE_MEMORY, TranspositionTable, Zobrist
+
+
+def _worker(matrix, shard, workers, memory, checks, symmetry, inboxes, conn):
+	"""
+	Worker process of parallel_bfs, owns the seen states and the frontier nodes whose key % workers == shard
+
+	Messages (kind, data) received on conn from the coordinator, each one is answered:
+		('root', (key, state, boxes_hash)): make the initial state the frontier of this worker,
+			answered with None.
+		('layer', radix): expand the frontier, send the children owned by the other workers
+			straight to their inboxes, then keep the children of this shard (its own and the
+			ones received) not seen before and not deadlocked as the next frontier. Answered
+			with (size of the new frontier, (rank, ref) of its first solved node or None).
+		('node', index): answered with (parent ref, box, move index) of a node.
+		('stop', None): answered with the stats and deadlock counters, then the worker exits.
+
+	A child is (rank, key, state, boxes_hash, parent ref, box, move). The rank orders the nodes
+	of a layer as bfs does: rank(child) = rank(parent) * radix + index of the push, with radix
+	above the number of pushes of a state. A ref is the global id of a node: index * workers + shard.
+	A worker stops expanding at its first solved child: a solved state is never seen before
+	nor deadlocked, so it is kept and the layer holds the solution.
+	"""
+	level = Level(matrix)
+	zobrist = Zobrist(level)
+	state_key = partial(LevelSymmetry(level).key, zobrist) if symmetry else zobrist.hash
+	deadlocks = DeadlockDetector(level, checks)
+	stats = SearchStats()
+	seen = TranspositionTable(memory)
+	arena = NodeArena()
+	# (rank, state, boxes_hash, ref) of the nodes of the current layer owned by this worker
+	frontier = []
+	depth = 0
+
+	while True:
+		kind, data = conn.recv()
+		if kind == 'root':
+			key, state, boxes_hash = data
+			seen.put(key, 0)
+			frontier = [(0, state, boxes_hash, shard)]
+			conn.send(None)
+		elif kind == 'layer':
+			radix = data
+			depth += 1
+			outgoing = [[] for _ in range(workers)]
+			found = False
+			for rank, state, boxes_hash, ref in frontier:
+				stats.expanded += 1
+				for i, (box, move, new_state, _) in enumerate(push_moves(level, state)):
+					stats.generated += 1
+					new_hash = zobrist.push(boxes_hash, box, level.offset(move))
+					key = state_key(new_state, new_hash)
+					outgoing[key % workers].append((rank * radix + i, key, new_state, new_hash, ref, box, move))
+					found = found or is_solved(level, new_state)
+				# the rest of the frontier only has children of larger rank, the search ends with this layer
+				if found:
+					break
+
+			# one batch to every other worker, even empty, so each owner knows when the layer is complete
+			for owner, children in enumerate(outgoing):
+				if owner != shard:
+					inboxes[owner].put(children)
+			children = outgoing[shard]
+			for _ in range(workers - 1):
+				children.extend(inboxes[shard].get())
+
+			# the first child in sequential order wins, as in bfs
+			children.sort(key=itemgetter(0))
+			frontier = []
+			solved = None
+			for rank, key, new_state, new_hash, parent, box, move in children:
+				if seen.get(key) is not None:
+					stats.duplicates += 1
+					continue
+				if deadlocks(new_state, box + level.offset(move)):
+					continue
+				seen.put(key, depth)
+				ref = arena.add(parent, box, move) * workers + shard
+				frontier.append((rank, new_state, new_hash, ref))
+				if solved is None and is_solved(level, new_state):
+					solved = (rank, ref)
+			conn.send((len(frontier), solved))
+		elif kind == 'node':
+			conn.send((arena.parents[data], arena.boxes[data], arena.moves[data]))
+		else:
+			stats.deadlocks = dict(deadlocks.hits)
+			conn.send((stats.as_dict(), dict(deadlocks.calls)))
+			return
+
+
+def parallel_bfs(matrix, player_pos, workers=None, memory=TABLE_MEMORY, checks=DEFAULT_CHECKS,
+				 progress=None, symmetry=False, stats=None):
+	"""
+	Use Breadth-First Search over box pushes on several processes to solve the Sokoban puzzle.
+
+	Parameters:
+		matrix (np.ndarray): The Sokoban puzzle, 2D numpy array. (height, width)
+		player_pos (tuple): The player's position. (x, y)
+		workers (int): Number of worker processes. default is os.cpu_count().
+		memory (int): Memory budget of all the seen states shards in bytes. default is TABLE_MEMORY.
+		checks (iterable): Names of the deadlock checks to run. default is DEFAULT_CHECKS.
+		progress (Progress): Observer notified of the depth after the layers (due() counts layers,
+			not expansions) and of the result. default is None.
+		symmetry (bool): Whether states mirrored by a symmetry of the level are seen once. default is False.
+		stats (SearchStats): Counters to fill with the sum of the workers' counters. default is None.
+
+	Returns:
+		tuple: The solution path as a string and depth, the same as bfs.
+
+	Description:
+		Every state is owned by the worker key % workers, which keeps its seen entry and, once
+		it is reached, its frontier node. Each layer the workers expand their own frontier and
+		send the children owned by another worker straight to its inbox, one batch per pair of
+		workers. The owner drops the children already seen or deadlocked, in sequential order
+		(see the rank in _worker), so the layers and the solution found are the same as in bfs.
+		The coordinator only runs the barrier between layers, stops at the first layer holding
+		a solved node, the one of smallest rank, and follows its parent refs across the workers.
+	"""
+
+	if workers is None:
+		workers = os.cpu_count() or 1
+	if workers < 1:
+		raise ValueError(f'Invalid number of workers: {workers}')
+	print(f'Parallel Breadth-First Search - {workers} workers')
+	stats = stats if stats is not None else SearchStats()
+
+	# Get the static level and the initial state (player cell and box cells)
+	level = Level(matrix)
+	initial_state = level.initial._replace(player=level.cell(player_pos))
+	zobrist = Zobrist(level)
+	state_key = partial(LevelSymmetry(level).key, zobrist) if symmetry else zobrist.hash
+	start_state = normalize(level, initial_state)
+	start_hash = zobrist.boxes_hash(start_state.boxes)
+	start_key = state_key(start_state, start_hash)
+	# a state has at most 4 pushes per box
+	radix = 4 * len(start_state.boxes) or 1
+
+	# one pipe per worker to the coordinator, one inbox per worker for the children of the others
+	inboxes = [multiprocessing.Queue() for _ in range(workers)]
+	connections, processes = [], []
+	for shard in range(workers):
+		conn, child_conn = multiprocessing.Pipe()
+		process = multiprocessing.Process(
+			target=_worker, daemon=True,
+			args=(matrix, shard, workers, memory // workers, checks, symmetry, inboxes, child_conn),
+		)
+		process.start()
+		connections.append(conn)
+		processes.append(process)
+
+	path = None
+	depth = 0
+	calls = {}
+	try:
+		connections[start_key % workers].send(('root', (start_key, start_state, start_hash)))
+		connections[start_key % workers].recv()
+		goal = None
+		size = 1
+
+		while size and goal is None:
+			for conn in connections:
+				conn.send(('layer', radix))
+			size = 0
+			for conn in connections:
+				part, solved = conn.recv()
+				size += part
+				if solved is not None and (goal is None or solved < goal):
+					goal = solved
+			depth += 1
+			print(f'Depth: {depth}')
+			if progress is not None and progress.due():
+				progress.report('[BFS]', depth, '', stats)
+
+		# rebuild the pushes by following the global parent refs across the workers
+		if goal is not None:
+			pushes = []
+			ref = goal[1]
+			while True:
+				connections[ref % workers].send(('node', ref // workers))
+				parent, box, move = connections[ref % workers].recv()
+				if parent < 0:
+					break
+				pushes.append((box, MOVES[move]))
+				ref = parent
+			path = rebuild_path(level, initial_state, pushes[::-1])
+
+		# collect the stats and deadlock counters of every worker
+		for conn in connections:
+			conn.send(('stop', None))
+			worker_stats, worker_calls = conn.recv()
+			stats.merge(worker_stats)
+			for name in worker_calls:
+				calls[name] = calls.get(name, 0) + worker_calls[name]
+	finally:
+		for process in processes:
+			process.join(timeout=1)
+			if process.is_alive():
+				process.terminate()
+
+	deadlocks = ', '.join(f'{name} {stats.deadlocks.get(name, 0)}/{calls[name]}' for name in calls)
+	if path is not None:
+		print(f'[BFS] Solution found!\n\n{path}\nDepth {len(path)}\nNodes: {stats}\nDeadlocks: {deadlocks}\n')
+		if progress is not None:
+			progress.finish('[BFS]', path, len(path), stats)
+		return (path, len(path))
+
+	# solution not found
+	print(f'[BFS] Solution not found!\nNodes: {stats}\nDeadlocks: {deadlocks}\n')
+	if progress is not None:
+		progress.finish('[BFS]', None, depth, stats)
+	return (None, -1)
+
+# get player position and call parallel_bfs
+def solve_parallel_bfs(puzzle, workers=None, memory=TABLE_MEMORY, checks=DEFAULT_CHECKS,
+					   progress=None, symmetry=False, stats=None):
+	matrix = puzzle
+	where = np.where((matrix == '*') | (matrix == '%'))
+	player_pos = where[0][0], where[1][0]
+	return parallel_bfs(matrix, player_pos, workers, memory, checks, progress, symmetry, stats)
+
+
+if __name__ == '__main__':
+	# count the runtime
+	start = time.time()
+	solve_parallel_bfs(np.loadtxt('levels/lvl7.dat', dtype='<U1'))
+	print(f'Runtime: {time.time() - start} seconds')
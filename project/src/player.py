@@ -4,6 +4,7 @@ from collections import defaultdict
 import pygame
 from pygame.sprite import Sprite
 
+from . import assets
 from .box import Box, Obstacle
 
 
@@ -12,14 +13,10 @@ class Player(Sprite):
     def __init__(self, *groups, x, y, game):
         super().__init__(*groups)
         self.game = game
-        self.up = pygame.image.load('img/playerU.png')
-        self.up = pygame.transform.scale(self.up, [64, 64])
-        self.down = pygame.image.load('img/playerD.png')
-        self.down = pygame.transform.scale(self.down, [64, 64])
-        self.left = pygame.image.load('img/playerL.png')
-        self.left = pygame.transform.scale(self.left, [64, 64])
-        self.right = pygame.image.load('img/playerR.png')
-        self.right = pygame.transform.scale(self.right, [64, 64])
+        self.up = assets.image('playerU.png')
+        self.down = assets.image('playerD.png')
+        self.left = assets.image('playerL.png')
+        self.right = assets.image('playerR.png')
         self.image = self.down
         self.rect = pygame.Rect(x * 64, y * 64, 64, 64)
         self.x = x
@@ -83,13 +80,7 @@ class ReversePlayer(Player):
         print('\n')
 
     def get_state(self):
-        state = ''
-        height, width = len(self.game.puzzle), len(self.game.puzzle[0])
-        for row in range(height):
-            for col in range(width):
-                if self.game.puzzle[row, col]:
-                    state += str(self.game.puzzle[row, col])
-        return state 
+        return ''.join(str(elem) for elem in self.game.puzzle.flat if elem)
 
     def update(self, puzzle_size):
         height, width = puzzle_size
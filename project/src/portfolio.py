@@ -0,0 +1,107 @@
+import contextlib
+import io
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from .astar import solve_astar
+from .bfs import solve_bfs
+
+# engines raced by solve_portfolio, name -> (solver, keyword arguments),
+# they always search: a cached engine would win every race
+ENGINES = {
+	'bfs': (solve_bfs, {'cache': False}),
+	'astar_manhattan': (solve_astar, {'heuristic': 'manhattan', 'cache': False}),
+	'astar_dijkstra': (solve_astar, {'heuristic': 'dijkstra', 'cache': False}),
+	'astar_matching': (solve_astar, {'heuristic': 'matching', 'cache': False}),
+	'greedy': (solve_astar, {'heuristic': 'matching', 'mode': 'greedy', 'cache': False}),
+}
+
+
+def _run(name, puzzle, conn):
+	"""Run one engine in its own process and send back (name, solution, depth, runtime)"""
+	solver, kwargs = ENGINES[name]
+	start = time.time()
+	# the solvers print their progress, keep the output of the race readable
+	with contextlib.redirect_stdout(io.StringIO()):
+		solution, depth = solver(puzzle, **kwargs)
+	conn.send((name, solution, depth, round(time.time() - start, 5)))
+	conn.close()
+
+
+def solve_portfolio(puzzle, timeout=None, engines=None):
+	"""
+	Race several solvers in separate processes and take the first answer
+
+	Parameters:
+		puzzle (np.ndarray): The Sokoban puzzle, 2D numpy array. (height, width)
+		timeout (float): Seconds to wait for an answer, None to wait for the last engine. default is None.
+		engines (iterable): Names of the engines in ENGINES to race. default is every engine.
+
+	Returns:
+		tuple: The solution path as a string, depth and the name of the engine that answered first.
+			(None, -1, None) if no engine answered before the timeout.
+
+	Description:
+		Every engine is complete, so the first engine to finish answers for all of them:
+		a solution, or (None, -1) when the level has none. The other engines are
+		terminated as soon as an answer arrives or the timeout expires.
+	"""
+	names = list(ENGINES if engines is None else engines)
+	for name in names:
+		if name not in ENGINES:
+			raise ValueError(f'Invalid engine: {name}')
+	print(f'Portfolio - {", ".join(names)}')
+
+	# one process and one pipe per engine
+	processes, connections = [], []
+	for name in names:
+		conn, child_conn = multiprocessing.Pipe(duplex=False)
+		process = multiprocessing.Process(target=_run, args=(name, puzzle, child_conn), daemon=True)
+		process.start()
+		child_conn.close()
+		processes.append(process)
+		connections.append(conn)
+
+	deadline = None if timeout is None else time.time() + timeout
+	answer = None
+	try:
+		pending = list(connections)
+		while pending and answer is None:
+			remaining = None if deadline is None else max(0, deadline - time.time())
+			ready = wait(pending, timeout=remaining)
+			if not ready:
+				break
+			for conn in ready:
+				pending.remove(conn)
+				try:
+					answer = conn.recv()
+				except EOFError:
+					# the engine died without answering (e.g. out of memory), wait for the others
+					continue
+				break
+	finally:
+		# cancel the engines still running
+		for process in processes:
+			if process.is_alive():
+				process.terminate()
+		for process in processes:
+			process.join()
+		for conn in connections:
+			conn.close()
+
+	if answer is None:
+		print(f'[Portfolio] No answer{"" if timeout is None else f" in {timeout}s"}!\n')
+		return (None, -1, None)
+	name, solution, depth, runtime = answer
+	print(f'[Portfolio] {name} answered in {runtime}s\n\n{solution}\nDepth {depth}\n')
+	return (solution, depth, name)
+
+
+if __name__ == '__main__':
+	# count the runtime
+	start = time.time()
+	solve_portfolio(np.loadtxt('levels/lvl7.dat', dtype='<U1'), timeout=60)
+	print(f'Runtime: {time.time() - start} seconds')
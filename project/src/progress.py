@@ -0,0 +1,57 @@
+import time
+from collections import namedtuple
+
+# a notification of a solver:
+# solver (str): label of the solver (e.g: '[A*]')
+# status (str): 'searching', 'solved' or 'not found'
+# depth (int): pushes of the node being expanded, of the solution or reached when the search failed
+# path (str): pushes so far as letters while searching, the solution path once solved, None otherwise
+# stats (SearchStats): counters of the search
+Report = namedtuple('Report', 'solver status depth path stats')
+
+# default throttling of the notifications while searching
+PROGRESS_EVERY = 1000
+PROGRESS_INTERVAL = 50
+
+
+class Progress:
+	"""
+	Throttled observer of a search
+
+	Parameters:
+		callback (callable): Called with a Report.
+		every (int): Notify after this many expansions, None to only use the interval. Defaults to PROGRESS_EVERY.
+		interval (float): Notify when this many milliseconds went by since the last notification,
+			None to only count expansions. Defaults to PROGRESS_INTERVAL.
+
+	Description:
+		A solver calls due() once per expansion and builds the report only when it returns True,
+		so the cost of a notification (rebuilding the pushes, drawing) is paid a few times per
+		second instead of per node. The final report (finish) is never throttled. A solver
+		given no observer (progress=None) only tests it against None.
+	"""
+	def __init__(self, callback, every=PROGRESS_EVERY, interval=PROGRESS_INTERVAL):
+		if every is not None and every < 1:
+			raise ValueError(f'Invalid number of expansions: {every}')
+		if interval is not None and interval < 0:
+			raise ValueError(f'Invalid interval: {interval}')
+		self.callback = callback
+		self.every = every if every is not None else float('inf')
+		self.interval = interval / 1000 if interval is not None else float('inf')
+		self.count = 0
+		self.deadline = time.perf_counter() + self.interval
+
+	def due(self):
+		"""Count an expansion, True when the observer is due a report"""
+		self.count += 1
+		return self.count >= self.every or time.perf_counter() >= self.deadline
+
+	def report(self, solver, depth, path, stats):
+		"""Notify the progress of the search and restart the throttling"""
+		self.count = 0
+		self.deadline = time.perf_counter() + self.interval
+		self.callback(Report(solver, 'searching', depth, path, stats))
+
+	def finish(self, solver, path, depth, stats):
+		"""Notify the end of the search, path is None when no solution was found"""
+		self.callback(Report(solver, 'solved' if path is not None else 'not found', depth, path, stats))
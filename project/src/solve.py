@@ -0,0 +1,245 @@
+"""
+Headless batch solver, one JSON line per level on stdout
+
+Usage:
+	python -m src.solve 'levels/*.dat' --algorithm astar --heuristic matching --time-limit 60 --memory-limit 2048
+	python -m src.solve levels/lvl5.dat --timing --timeline 100 --profile --output-dir stat
+
+Never imports pygame: the solvers report their progress to an optional observer (see progress.Progress).
+"""
+import argparse
+import contextlib
+import cProfile
+import glob
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from .deadlock import CHECKS, DEFAULT_CHECKS
+from .heuristics import HEURISTICS
+from .stats import SearchStats
+
+ALGORITHMS = ('bfs', 'astar', 'idastar', 'bidirectional')
+MODES = ('astar', 'weighted', 'greedy')
+
+
+def solve_puzzle(puzzle, algorithm='astar', heuristic='manhattan', mode='astar', checks=DEFAULT_CHECKS, cache=False,
+				 stats=None, progress=None, workers=1):
+	"""
+	Solve a puzzle with one of ALGORITHMS
+
+	Parameters:
+		puzzle (np.ndarray): The Sokoban puzzle, 2D numpy array. (height, width)
+		algorithm (str): One of ALGORITHMS. Defaults to 'astar'.
+		heuristic (str): The heuristic of astar and idastar. Defaults to 'manhattan'.
+		mode (str): The search mode of astar. Defaults to 'astar'.
+		checks (iterable): Names of the deadlock checks to run. Defaults to DEFAULT_CHECKS.
+		cache (bool): Whether the solution cache is consulted. Defaults to False.
+		stats (SearchStats): Counters to fill during the search. Defaults to None.
+		progress (Progress): Observer of the search. Defaults to None.
+		workers (int): Worker processes of bfs (parallel_bfs) and astar (hdastar), None for one per CPU. Defaults to 1.
+
+	Returns:
+		tuple: The solution path as a string and depth.
+	"""
+	from .astar import solve_astar
+	from .bfs import solve_bfs
+	from .bidirectional import solve_bidirectional
+	from .idastar import solve_idastar
+
+	if algorithm not in ALGORITHMS:
+		raise ValueError(f'Invalid algorithm: {algorithm}')
+	if workers != 1 and algorithm not in ('bfs', 'astar'):
+		raise ValueError(f'Algorithm {algorithm} does not run on several workers')
+	cache = None if cache else False
+	if algorithm == 'bfs':
+		return solve_bfs(puzzle, progress, checks=checks, cache=cache, stats=stats, workers=workers)
+	if algorithm == 'astar':
+		return solve_astar(puzzle, progress, heuristic=heuristic, checks=checks, mode=mode, stats=stats, cache=cache,
+						   workers=workers)
+	if algorithm == 'idastar':
+		return solve_idastar(puzzle, progress, heuristic=heuristic, checks=checks, stats=stats, cache=cache)
+	return solve_bidirectional(puzzle, progress, checks=checks, stats=stats)
+
+
+def solve_level(path, algorithm='astar', heuristic='manhattan', mode='astar', checks=DEFAULT_CHECKS, cache=False,
+				timing=False, timeline=None, profile=False, output_dir='.', workers=1):
+	"""
+	Solve one level file with the solver output silenced
+
+	Parameters:
+		path (str): The level file (.dat).
+		algorithm (str): One of ALGORITHMS. Defaults to 'astar'.
+		heuristic (str): The heuristic of astar and idastar. Defaults to 'manhattan'.
+		mode (str): The search mode of astar. Defaults to 'astar'.
+		checks (iterable): Names of the deadlock checks to run. Defaults to DEFAULT_CHECKS.
+		cache (bool): Whether the solution cache is consulted. Defaults to False.
+		timing (bool): Time the push generation, deadlock checks and heuristic (see SearchStats). Defaults to False.
+		timeline (int): Sample the frontier size every this many expansions. Defaults to None.
+		profile (bool): Run the solver under cProfile. Defaults to False.
+		output_dir (str): Where the timeline (<level>-<algorithm>.csv) and the profile
+			(<level>-<algorithm>.prof) are written. Defaults to '.'.
+		workers (int): Worker processes of the search, see solve_puzzle. Defaults to 1.
+
+	Returns:
+		dict: solution, depth, the counters of SearchStats, peak memory (bytes), wall time (s)
+			and the timeline and profile files when they are written.
+	"""
+	puzzle = np.loadtxt(path, dtype='<U1')
+	stats = SearchStats(timing, timeline)
+	profiler = cProfile.Profile() if profile else None
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		if profiler:
+			profiler.enable()
+		solution, depth = solve_puzzle(puzzle, algorithm, heuristic, mode, checks, cache, stats, workers=workers)
+		if profiler:
+			profiler.disable()
+	wall_time = time.perf_counter() - start
+	result = {
+		'status': 'solved' if solution is not None else 'unsolvable',
+		'solution': solution,
+		'depth': depth,
+		**stats.as_dict(),
+		# ru_maxrss is in KiB on Linux, the children are the workers of a parallel search
+		'peak_memory': max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)) * 1024,
+		'wall_time': round(wall_time, 5),
+	}
+
+	# the timeline goes to a CSV file for plotting (see stats.plot_timeline), the profile to a pstats file
+	name = f'{os.path.splitext(os.path.basename(path))[0]}-{algorithm}'
+	del result['frontier']
+	if timeline:
+		result['timeline'] = os.path.join(output_dir, f'{name}.csv')
+		stats.dump_timeline(result['timeline'])
+	if profiler:
+		result['profile'] = os.path.join(output_dir, f'{name}.prof')
+		profiler.dump_stats(result['profile'])
+	return result
+
+
+def _run(path, options, memory_limit, conn):
+	"""Worker process: apply the memory limit, solve the level and send back the result"""
+	if memory_limit:
+		limit = memory_limit * 2**20
+		resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+	try:
+		result = solve_level(path, **options)
+	except MemoryError:
+		result = {'status': 'memory'}
+	except Exception as e:
+		result = {'status': 'error', 'error': f'{type(e).__name__}: {e}'}
+	conn.send(result)
+	conn.close()
+
+
+def solve_levels(paths, options, workers=None, time_limit=None, memory_limit=None, output=sys.stdout):
+	"""
+	Solve levels on a pool of worker processes and stream one JSON line per level as they finish
+
+	Parameters:
+		paths (list): The level files.
+		options (dict): Keyword arguments of solve_level.
+		workers (int): Number of levels solved at the same time. Defaults to os.cpu_count().
+		time_limit (float): Wall time limit per level in seconds, None for no limit. Defaults to None.
+		memory_limit (int): Address space limit per level in MiB, None for no limit. Defaults to None.
+		output (file): Where the JSON lines are written. Defaults to sys.stdout.
+
+	Description:
+		Every level runs in its own process so a level over the time limit can be terminated
+		and a level over the memory limit only fails itself. At most workers processes run
+		at a time. The status of a line is 'solved', 'unsolvable', 'timeout', 'memory' or 'error'.
+	"""
+	workers = workers or os.cpu_count() or 1
+	pending = list(paths)
+	running = {}
+	while pending or running:
+		# start levels while there is a free worker
+		while pending and len(running) < workers:
+			path = pending.pop(0)
+			conn, child_conn = multiprocessing.Pipe(duplex=False)
+			# not daemonic, the search may start its own workers (parallel_bfs, hdastar)
+			process = multiprocessing.Process(target=_run, args=(path, options, memory_limit, child_conn))
+			process.start()
+			child_conn.close()
+			running[conn] = (path, process, time.perf_counter())
+
+		# wait for a level to finish or for the closest deadline
+		timeout = None
+		if time_limit is not None:
+			timeout = max(0, min(start for _, _, start in running.values()) + time_limit - time.perf_counter())
+		ready = wait(list(running), timeout=timeout)
+
+		now = time.perf_counter()
+		for conn, (path, process, start) in list(running.items()):
+			if conn in ready:
+				try:
+					result = conn.recv()
+				except EOFError:
+					# killed by the system, most likely out of memory
+					result = {'status': 'memory' if memory_limit else 'error'}
+			elif time_limit is not None and now - start >= time_limit:
+				process.terminate()
+				result = {'status': 'timeout'}
+			else:
+				continue
+			process.join()
+			conn.close()
+			del running[conn]
+			result.setdefault('wall_time', round(now - start, 5))
+			line = {'level': path, 'algorithm': options['algorithm'], **result}
+			output.write(json.dumps(line) + '\n')
+			output.flush()
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog='python -m src.solve', description=__doc__.strip().split('\n')[0])
+	parser.add_argument('levels', nargs='+', help="level files or glob patterns (e.g: 'levels/*.dat')")
+	parser.add_argument('-a', '--algorithm', choices=ALGORITHMS, default='astar')
+	parser.add_argument('--heuristic', choices=HEURISTICS, default='manhattan', help='heuristic of astar and idastar')
+	parser.add_argument('--mode', choices=MODES, default='astar', help='search mode of astar')
+	parser.add_argument('--checks', default=','.join(DEFAULT_CHECKS), help=f'deadlock checks among {", ".join(CHECKS)}')
+	parser.add_argument('-t', '--time-limit', type=float, default=None, help='wall time limit per level (s)')
+	parser.add_argument('-m', '--memory-limit', type=int, default=None, help='address space limit per level (MiB)')
+	parser.add_argument('-j', '--workers', type=int, default=None, help='levels solved at the same time')
+	parser.add_argument('--search-workers', type=int, default=1, help='worker processes of a bfs or astar search, 0 for one per CPU')
+	parser.add_argument('--cache', action='store_true', help='consult and fill the solution cache')
+	parser.add_argument('--timing', action='store_true', help='time the push generation, deadlock checks and heuristic')
+	parser.add_argument('--timeline', type=int, default=None, help='sample the frontier size every N expansions')
+	parser.add_argument('--profile', action='store_true', help='run the solvers under cProfile')
+	parser.add_argument('--output-dir', default='.', help='where the timelines (.csv) and profiles (.prof) are written')
+	args = parser.parse_args(argv)
+
+	paths = []
+	for pattern in args.levels:
+		paths.extend(sorted(glob.glob(pattern)) or [pattern])
+	checks = tuple(name for name in args.checks.split(',') if name)
+	for name in checks:
+		if name not in CHECKS:
+			parser.error(f'invalid deadlock check: {name}')
+	options = {
+		'algorithm': args.algorithm,
+		'heuristic': args.heuristic,
+		'mode': args.mode,
+		'checks': checks,
+		'cache': args.cache,
+		'timing': args.timing,
+		'timeline': args.timeline,
+		'profile': args.profile,
+		'output_dir': args.output_dir,
+		'workers': args.search_workers or None,
+	}
+	if args.timeline or args.profile:
+		os.makedirs(args.output_dir, exist_ok=True)
+	solve_levels(paths, options, args.workers, args.time_limit, args.memory_limit)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,121 @@
+import csv
+import time
+
+# counters summed by merge and printed by __str__
+COUNTERS = ('expanded', 'generated', 'duplicates', 'reopened', 'evaluations')
+
+
+class SearchStats:
+	"""
+	Counters filled by a solver while it searches
+
+	Parameters:
+		timing (bool): Time the push generation, the deadlock checks and the heuristic. Defaults to False.
+		timeline (int): Sample the frontier size every this many expansions, None to not sample. Defaults to None.
+
+	Attributes:
+		expanded (int): Number of nodes taken from the frontier and expanded.
+		generated (int): Number of children generated (before duplicate and deadlock pruning).
+		duplicates (int): Number of children pruned because they were already reached at a better or equal cost.
+		reopened (int): Number of states pushed again because they were reached at a better cost.
+		evaluations (int): Number of heuristic evaluations.
+		deadlocks (dict): Number of children pruned by each deadlock check.
+		times (dict): Seconds spent in push_moves (where can_move runs), is_deadlock (the deadlock
+			checks) and heuristic, only filled when timing.
+		frontier (list): Samples (expanded, seconds since the stats were created, frontier size),
+			only filled with a timeline.
+
+	Description:
+		The timers wrap the functions once when the search starts (see timed), so a search
+		without timing calls them directly and pays nothing for the instrumentation.
+	"""
+	def __init__(self, timing=False, timeline=None):
+		if timeline is not None and timeline < 1:
+			raise ValueError(f'Invalid timeline interval: {timeline}')
+		self.timing = timing
+		self.timeline = timeline
+		self.expanded = 0
+		self.generated = 0
+		self.duplicates = 0
+		self.reopened = 0
+		self.evaluations = 0
+		self.deadlocks = {}
+		self.times = {}
+		self.frontier = []
+		self._start = time.perf_counter()
+
+	def timed(self, name, function, iterate=False):
+		"""
+		Add the run time of a function to times[name]
+
+		Parameters:
+			name (str): The timer.
+			function (callable): The function to time.
+			iterate (bool): The function returns a generator, time its items too (as a list). Defaults to False.
+
+		Returns:
+			callable: function itself when timing is off, a timed wrapper otherwise.
+		"""
+		if not self.timing:
+			return function
+		times = self.times
+		times.setdefault(name, 0.0)
+
+		def wrapper(*args):
+			start = time.perf_counter()
+			try:
+				result = function(*args)
+				return list(result) if iterate else result
+			finally:
+				times[name] += time.perf_counter() - start
+		return wrapper
+
+	def sample(self, frontier):
+		"""Record the frontier size, called every timeline expansions"""
+		self.frontier.append((self.expanded, round(time.perf_counter() - self._start, 6), frontier))
+
+	def merge(self, other):
+		"""Add the counters of another search (as_dict), e.g: of a worker process"""
+		for name in COUNTERS:
+			setattr(self, name, getattr(self, name) + other.get(name, 0))
+		for name in ('deadlocks', 'times'):
+			for key, value in other.get(name, {}).items():
+				getattr(self, name)[key] = getattr(self, name).get(key, 0) + value
+		self.frontier.extend(other.get('frontier', ()))
+
+	def dump_timeline(self, path):
+		"""Write the frontier samples to a CSV file (expanded, seconds, frontier), see plot_timeline"""
+		with open(path, 'w', newline='') as f:
+			writer = csv.writer(f)
+			writer.writerow(('expanded', 'seconds', 'frontier'))
+			writer.writerows(self.frontier)
+
+	def as_dict(self):
+		return {name: value for name, value in vars(self).items() if name not in ('timing', 'timeline') and name[0] != '_'}
+
+	def __str__(self):
+		return ', '.join(f'{name} {getattr(self, name)}' for name in COUNTERS)
+
+
+def plot_timeline(paths, output=None, x='expanded'):
+	"""
+	Plot frontier timelines written by SearchStats.dump_timeline with matplotlib
+
+	Parameters:
+		paths (list): The CSV files, one line per file.
+		output (str): Save the figure to this image file, show it if None. Defaults to None.
+		x (str): 'expanded' or 'seconds' on the x axis. Defaults to 'expanded'.
+	"""
+	import matplotlib.pyplot as plt
+
+	for path in paths:
+		with open(path, newline='') as f:
+			rows = list(csv.DictReader(f))
+		plt.plot([float(row[x]) for row in rows], [int(row['frontier']) for row in rows], label=path)
+	plt.xlabel(x)
+	plt.ylabel('frontier')
+	plt.legend()
+	if output:
+		plt.savefig(output)
+	else:
+		plt.show()
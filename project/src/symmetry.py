@@ -0,0 +1,151 @@
+from .level import State
+from .utils import reachable
+
+# the 8 dihedral transforms of a grid as (swap, flip_rows, flip_cols), applied in that order:
+# swap the rows and the columns (transpose), then mirror upside down, then mirror left to right
+TRANSFORMS = [(swap, flip_rows, flip_cols) for swap in (False, True) for flip_rows in (False, True) for flip_cols in (False, True)]
+# path letters as (row, col) steps
+STEPS = {'U': (-1, 0), 'D': (1, 0), 'L': (0, -1), 'R': (0, 1)}
+LETTERS = {step: letter for letter, step in STEPS.items()}
+
+
+def inverse(transform):
+	"""The transform that undoes transform"""
+	swap, flip_rows, flip_cols = transform
+	# mirroring the rows before a transpose is mirroring the columns after it
+	return (swap, flip_cols, flip_rows) if swap else transform
+
+
+def transform_cell(cell, shape, transform):
+	"""
+	Map a cell of a grid through a transform
+
+	Parameters:
+		cell (tuple): The cell (row, col).
+		shape (tuple): The shape (height, width) of the grid before the transform.
+		transform (tuple): One of TRANSFORMS.
+
+	Returns:
+		tuple: The cell (row, col) in the transformed grid.
+	"""
+	swap, flip_rows, flip_cols = transform
+	(row, col), (height, width) = cell, shape
+	if swap:
+		row, col, height, width = col, row, width, height
+	return (height - 1 - row if flip_rows else row, width - 1 - col if flip_cols else col)
+
+
+def transform_grid(rows, transform):
+	"""Map a grid (tuple of strings) through a transform"""
+	swap, flip_rows, flip_cols = transform
+	if swap:
+		rows = tuple(''.join(column) for column in zip(*rows))
+	if flip_rows:
+		rows = rows[::-1]
+	if flip_cols:
+		rows = tuple(row[::-1] for row in rows)
+	return rows
+
+
+def transform_path(path, transform):
+	"""
+	Map a path through a transform (e.g: mirroring left to right swaps L and R)
+
+	Parameters:
+		path (str): The path. (e.g: 'RULD')
+		transform (tuple): One of TRANSFORMS.
+
+	Returns:
+		str: The path in the transformed grid.
+	"""
+	swap, flip_rows, flip_cols = transform
+	letters = {}
+	for letter, (row, col) in STEPS.items():
+		if swap:
+			row, col = col, row
+		letters[letter] = LETTERS[(-row if flip_rows else row, -col if flip_cols else col)]
+	return ''.join(letters[letter] for letter in path)
+
+
+def canonical_symmetry(rows, player):
+	"""
+	Reduce a level to the smallest of its 8 dihedral transforms
+
+	Parameters:
+		rows (tuple): The level without the player, one string per row (see cache.canonical_level).
+		player (tuple): The player cell (row, col).
+
+	Returns:
+		tuple: (rows, player, transform), the smallest (rows, player) of the transforms with
+			the player normalized to the smallest cell of its region, and the transform used.
+			A path of the original level maps to the canonical one with transform_path(path, transform),
+			and back with inverse(transform).
+	"""
+	shape = len(rows), len(rows[0])
+	forms = []
+	for transform in TRANSFORMS:
+		new_rows = transform_grid(rows, transform)
+		start = transform_cell(player, shape, transform)
+		# normalize the player in the transformed grid
+		region, stack = {start}, [start]
+		while stack:
+			row, col = stack.pop()
+			for d_row, d_col in STEPS.values():
+				cell = row + d_row, col + d_col
+				if cell not in region and new_rows[cell[0]][cell[1]] not in '+@$':
+					region.add(cell)
+					stack.append(cell)
+		forms.append((new_rows, min(region), transform))
+	return min(forms, key=lambda form: form[:2])
+
+
+class LevelSymmetry:
+	"""
+	The symmetries of a level (transforms mapping its walls and goals onto themselves)
+
+	Parameters:
+		level (Level): The static level (walls and goals).
+
+	Attributes:
+		maps (list): For every symmetry but the identity, the image of each cell.
+
+	Description:
+		A state and its images under a symmetry of the level are equally far from the goal,
+		so a visited set keyed by key() keeps a single one of them. Most levels have no
+		symmetry, then key() is the plain Zobrist hash.
+	"""
+	def __init__(self, level):
+		self.level = level
+		shape = level.height, level.width
+		self.maps = []
+		for transform in TRANSFORMS[1:]:
+			if transform[0] and level.height != level.width:
+				continue
+			image = [level.cell(transform_cell(level.position(cell), shape, transform)) for cell in range(len(level.walls))]
+			if (all(level.walls[image[cell]] == wall for cell, wall in enumerate(level.walls)) and
+				{image[goal] for goal in level.goals} == level.goals):
+				self.maps.append(image)
+
+	def __bool__(self):
+		return bool(self.maps)
+
+	def key(self, zobrist, state, boxes_hash=None):
+		"""
+		Smallest Zobrist hash of a state and its images
+
+		Parameters:
+			zobrist (Zobrist): The Zobrist keys of the level.
+			state (State): The state, with a normalized player cell.
+			boxes_hash (int): The hash of the boxes of state, when it is known. Defaults to None.
+
+		Returns:
+			int: The key of the state, the same for all of its images.
+		"""
+		key = zobrist.hash(state, boxes_hash)
+		if not self.maps:
+			return key
+		region = reachable(self.level, state)
+		for image in self.maps:
+			image_state = State(min(image[cell] for cell in region), [image[box] for box in state.boxes])
+			key = min(key, zobrist.hash(image_state))
+		return key
@@ -1,9 +1,191 @@
 import pygame
+import pygame_widgets
 from pygame_widgets.button import Button
 from pygame_widgets.textbox import TextBox
 from pygame_widgets.toggle import Toggle
 
 from .events import *
+from .progress import Progress
+
+# frames per second of the game loop
+FPS = 60
+# left edge of the sidebar, its widgets are drawn over the side floor
+SIDEBAR_X = 1024
+
+
+def play_solution(solution, game, widgets, show_solution, moves, renderer=None):
+
+	"""
+	Play the solution path
+
+	Parameters:
+		solution (str): The solution path. (e.g: 'RULD')
+		game (Game): The game instance. 
+		widgets (dict): The widgets dictionary. (label, seed, visualizer, moves_label, paths)
+		show_solution (bool): Whether to show the solution. 
+		moves (int): The number of moves.
+		renderer (Renderer): The renderer of the game loop. Defaults to a new one.
+	
+	Returns:
+		int: The number of moves.
+	"""
+	renderer = renderer or Renderer(game, widgets)
+	# the solution label was drawn over the last frame
+	renderer.invalidate()
+	for move in solution:
+		
+		# GUI
+		events = pygame.event.get()
+		moves += game.player.update(move)
+		renderer.frame(events, moves, show_solution)
+
+		# Delay solver
+		pygame.time.delay(130)
+	return moves
+
+
+class Renderer:
+	"""
+	Dirty-rectangle drawing of a game and the sidebar widgets
+
+	Parameters:
+		game (Game): The game to draw, its window is the display surface.
+		widgets (dict): The widgets dictionary (see sidebar_widgets).
+
+	Description:
+		The first frame draws the whole window, as does a frame after invalidate or with
+		one of the game events (a solver or a widget may have drawn anywhere). Otherwise a
+		frame only blits the cells of the sprites that moved or changed image, the solution
+		label over the cells it covers, and the sidebar when there were events or the moves
+		changed, and only updates those areas of the display. A frame with nothing to
+		draw doesn't update the display at all.
+		The widgets still listen to every frame, pygame_widgets follows the mouse buttons
+		by polling.
+	"""
+	def __init__(self, game, widgets):
+		self.game = game
+		self.window = game.window
+		self.widgets = widgets
+		self.sidebar = pygame.Rect(SIDEBAR_X, 0, game.width - SIDEBAR_X, game.height)
+		self.floor = {(sprite.x, sprite.y): sprite for sprite in game.floor_group}
+		# (position, image) of every object when it was last drawn
+		self.objects = {}
+		self.moves = None
+		self.full = True
+
+	def invalidate(self):
+		"""Draw the whole window on the next frame"""
+		self.full = True
+
+	def changed(self):
+		"""The cells (x, y) of the objects that moved or changed image since the last call"""
+		cells = set()
+		for sprite in self.game.object_group:
+			drawn = sprite.rect.topleft, sprite.image
+			last = self.objects.get(sprite)
+			if last != drawn:
+				self.objects[sprite] = drawn
+				cells.add((drawn[0][0] // 64, drawn[0][1] // 64))
+				if last:
+					cells.add((last[0][0] // 64, last[0][1] // 64))
+		return cells
+
+	def draw_cell(self, cell):
+		"""Blit the floor, the goal and the object of a cell, returns its rect"""
+		x, y = cell
+		rect = pygame.Rect(x * 64, y * 64, 64, 64)
+		self.window.blit(self.floor[cell].image, rect)
+		elem = self.game.puzzle[y, x]
+		if elem:
+			for sprite in (elem.ground, elem.obj):
+				if sprite:
+					self.window.blit(sprite.image, sprite.rect)
+		return rect
+
+	def draw_widgets(self, events, moves):
+		pygame_widgets.update(events)
+		self.widgets['label'].draw()
+		self.widgets['seed'].draw()
+		self.widgets['visualizer'].draw()
+		# print the number of moves with 20 font size
+		self.widgets['moves_label'].set_moves(f' Moves = {moves} ', 20)
+		self.moves = moves
+
+	def frame(self, events, moves, show_solution):
+		"""
+		Draw what changed since the last frame
+
+		Parameters:
+			events (list): The events of the frame (pygame.event.get()).
+			moves (int): The number of moves.
+			show_solution (bool): Whether the solution label is shown.
+
+		Returns:
+			list: The rects of the display updated, empty when idle.
+		"""
+		game, paths = self.game, self.widgets['paths']
+		if self.full or any(event.type >= pygame.USEREVENT for event in events):
+			game.floor_group.draw(self.window)
+			game.goal_group.draw(self.window)
+			game.object_group.draw(self.window)
+			self.draw_widgets(events, moves)
+			if show_solution:
+				paths.draw()
+			self.changed()
+			self.full = False
+			pygame.display.update()
+			return [self.window.get_rect()]
+
+		cells = self.changed()
+		rects = [self.draw_cell(cell) for cell in cells]
+		if show_solution and paths.rect.collidelist(rects) != -1:
+			# the label is translucent, the cells under it are drawn again before it
+			left, top = paths.rect.x // 64, paths.rect.y // 64
+			right, bottom = (paths.rect.right - 1) // 64, (paths.rect.bottom - 1) // 64
+			for x in range(left, min(right + 1, self.sidebar.x // 64)):
+				for y in range(top, min(bottom + 1, game.height // 64)):
+					if (x, y) not in cells:
+						rects.append(self.draw_cell((x, y)))
+			paths.draw()
+			rects.append(paths.rect.copy())
+		if events or moves != self.moves or self.widgets['seedbox'].selected:
+			for y in range(game.height // 64):
+				for x in range(self.sidebar.x // 64, game.width // 64):
+					self.draw_cell((x, y))
+			self.draw_widgets(events, moves)
+			rects.append(self.sidebar)
+		else:
+			pygame_widgets.update(events)
+		if rects:
+			pygame.display.update(rects)
+		return rects
+
+
+def solver_progress(widget, visualizer):
+	"""
+	Progress observer of a solver run from the GUI
+
+	Parameters:
+		widget (MultilineLabel): The label showing the solution.
+		visualizer (bool): Whether the pushes so far are shown while searching.
+
+	Returns:
+		Progress: The observer to pass to the solver, it keeps the window responsive.
+	"""
+	def update(report):
+		# check for pygame events
+		pygame.event.pump()
+		if not visualizer:
+			return
+		if report.status == 'searching':
+			widget.set_text(f'{report.solver} Solution Depth: {report.depth}\n{report.path}', 20)
+		elif report.status == 'solved':
+			widget.solved = True
+			widget.set_text(f'{report.solver} Solution Found!\n{report.path}', 20)
+		else:
+			widget.set_text(f'{report.solver} Solution Not Found!\nDepth {report.depth}', 20)
+		pygame.display.update()
+	return Progress(update)
 
 
 def sidebar_widgets(window):
@@ -32,8 +214,8 @@ def sidebar_widgets(window):
 		onClick=lambda: pygame.event.post(pygame.event.Event(RANDOM_GAME_EVENT)),
 		borderColor='black', borderThickness=2,
 	)
-	visualizer = Label(window, f'Visualize', 1055, 450, 16)
-	toggle = Toggle(window, 1160, 455, 18, 22, handleRadius=11)
+	visualizer = Label(window, f'Visualize', 1055, 570, 16)
+	toggle = Toggle(window, 1160, 575, 18, 22, handleRadius=11)
 	bfs_button = Button(
 		window, 1055, 280, 130, 40, text='Solve BFS', radius=5,
 		font=pygame.font.SysFont('Verdana', 18, bold=True),
@@ -52,6 +234,18 @@ def sidebar_widgets(window):
 		onClick=lambda: pygame.event.post(pygame.event.Event(SOLVE_DIJKSTRA_EVENT)),
 		borderColor='black', borderThickness=2,
 	)
+	matching_button = Button(
+		window, 1055, 460, 130, 40, text='A* Matching', radius=5,
+		font=pygame.font.SysFont('Verdana', 14, bold=True),
+		onClick=lambda: pygame.event.post(pygame.event.Event(SOLVE_MATCHING_EVENT)),
+		borderColor='black', borderThickness=2,
+	)
+	idastar_button = Button(
+		window, 1055, 520, 130, 40, text='IDA* Matching', radius=5,
+		font=pygame.font.SysFont('Verdana', 14, bold=True),
+		onClick=lambda: pygame.event.post(pygame.event.Event(SOLVE_IDASTAR_EVENT)),
+		borderColor='black', borderThickness=2,
+	)
 	seed = Label(window, f'Seed', 1055, 190, 16)
 	seedbox = TextBox(
 		window, 1110, 191, 75, 28, placeholderText='Seed',
@@ -79,6 +273,8 @@ def sidebar_widgets(window):
 		'seed': seed,
 		'astarman': astarman_button,
 		'dijkstra': dijk_button,
+		'matching': matching_button,
+		'idastar': idastar_button,
 	}
 
 
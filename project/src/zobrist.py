@@ -0,0 +1,146 @@
+import random
+from array import array
+from functools import reduce
+from operator import xor
+
+# bytes used by one table slot: 64-bit key + 32-bit value
+SLOT_SIZE = 12
+# default memory budget of a transposition table (bytes)
+TABLE_MEMORY = 32 * 2**20
+# slots of a new transposition table, it doubles up to its budget as states are stored
+TABLE_SLOTS = 1 << 12
+
+
+class Zobrist:
+	"""
+	64-bit Zobrist keys of a level: one random value per player cell and one per box cell
+
+	Parameters:
+		level (Level): The static level (walls and goals).
+		seed (int): Seed of the random values, keys are deterministic per level. Defaults to 0.
+
+	Description:
+		hash(state) = players[player] ^ boxes[box_1] ^ ... ^ boxes[box_n]
+		The box part is carried along the search and updated in O(1) on each push.
+	"""
+	def __init__(self, level, seed=0):
+		rng = random.Random(seed)
+		size = level.height * level.width
+		self.players = [rng.getrandbits(64) for _ in range(size)]
+		self.boxes = [rng.getrandbits(64) for _ in range(size)]
+
+	def boxes_hash(self, boxes):
+		"""Hash of the box cells only"""
+		return reduce(xor, (self.boxes[box] for box in boxes), 0)
+
+	def hash(self, state, boxes_hash=None):
+		"""Hash of a state, reusing boxes_hash when it is already known"""
+		if boxes_hash is None:
+			boxes_hash = self.boxes_hash(state.boxes)
+		return boxes_hash ^ self.players[state.player]
+
+	def push(self, boxes_hash, box, step):
+		"""Update the box hash when a box is pushed from box to box + step"""
+		return boxes_hash ^ self.boxes[box] ^ self.boxes[box + step]
+
+
+class TranspositionTable:
+	"""
+	Open-addressing hash table of state keys with a fixed memory budget
+
+	Parameters:
+		memory (int): Memory budget in bytes, the most the table grows to. Defaults to TABLE_MEMORY (32 MiB).
+		probes (int): Number of consecutive slots probed for a key. Defaults to 4.
+		replace (str): Replacement policy when every probed slot is taken. Defaults to 'always'.
+			'always': the new entry overwrites the first probed slot.
+			'depth': the entry with the largest value is overwritten, unless the new value is larger.
+
+	Description:
+		Keys are 64-bit Zobrist hashes, values are 32-bit ints (depth or best g-value).
+		The table starts with TABLE_SLOTS slots and doubles when it is half full or a key
+		finds every probed slot taken, so a small search only pays for the slots it uses.
+		Once it reaches the budget it never grows again: old entries are replaced, so a
+		replaced state may be searched again but memory stays at the budget.
+	"""
+	def __init__(self, memory=TABLE_MEMORY, probes=4, replace='always'):
+		if replace not in ('always', 'depth'):
+			raise ValueError(f'Invalid replacement policy: {replace}')
+		# the most slots is the biggest power of two that fits the budget
+		self.max_slots = 1 << max(0, (memory // SLOT_SIZE).bit_length() - 1)
+		self.probes = probes
+		self.replace = replace
+		self._allocate(min(TABLE_SLOTS, self.max_slots))
+
+	def _allocate(self, slots):
+		"""Replace the slots with slots empty ones"""
+		self.keys = array('Q', bytes(8 * slots))
+		self.values = array('i', bytes(4 * slots))
+		self.mask = slots - 1
+		self._probes = min(self.probes, slots)
+		self.size = 0
+
+	def _grow(self):
+		"""Double the slots and insert the entries again"""
+		keys, values = self.keys, self.values
+		self._allocate(2 * len(keys))
+		for key, value in zip(keys, values):
+			if key:
+				self.put(key, value)
+
+	def clear(self):
+		"""Remove every entry, the table keeps its slots"""
+		self._allocate(len(self.keys))
+
+	def __len__(self):
+		return self.size
+
+	def get(self, key):
+		"""
+		Look up a key
+
+		Parameters:
+			key (int): The 64-bit state hash.
+
+		Returns:
+			int: The stored value, None if the key is not in the table.
+		"""
+		key = key or 1	# 0 marks an empty slot
+		keys, mask = self.keys, self.mask
+		for i in range(self._probes):
+			slot_key = keys[(key + i) & mask]
+			if slot_key == key:
+				return self.values[(key + i) & mask]
+			if not slot_key:
+				return None
+		return None
+
+	def put(self, key, value):
+		"""
+		Store a value for a key, overwriting the value of a key already in the table
+
+		Parameters:
+			key (int): The 64-bit state hash.
+			value (int): The value to store.
+		"""
+		key = key or 1	# 0 marks an empty slot
+		keys, values, mask = self.keys, self.values, self.mask
+		victim = key & mask
+		for i in range(self._probes):
+			slot = (key + i) & mask
+			if keys[slot] == key or not keys[slot]:
+				if not keys[slot]:
+					self.size += 1
+				keys[slot], values[slot] = key, value
+				if 2 * self.size > len(keys) and len(keys) < self.max_slots:
+					self._grow()
+				return
+			if self.replace == 'depth' and values[slot] > values[victim]:
+				victim = slot
+		# every probed slot holds another state, make room or apply the replacement policy
+		if len(keys) < self.max_slots:
+			self._grow()
+			self.put(key, value)
+			return
+		if self.replace == 'depth' and values[victim] < value:
+			return
+		keys[victim], values[victim] = key, value